@@ -1,13 +1,31 @@
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
-from langchain_core. prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from agent.tools import search_patient_func, check_insurance_func, find_slots_func, book_appointment_func
+import time
+
+_MODULE_LOAD_START = time.perf_counter()
+
+from agent.tools import search_patient_func, check_insurance_func, find_slots_func, book_appointment_func, tool_functions
 from agent.validators import validator
+from agent.session import session_store, Session, names_patient, refers_to_previous_patient
+from agent.llm_replay import LLMCassette, RecordingLLM, ReplayLLM
+from agent.governor import ExecutionGovernor
+from api.mock_healthcare_api import healthcare_api
 from utils.audit_logger import audit_logger
+from utils.idempotency import idempotency_store, request_fingerprint, IdempotencyKeyConflict
 from utils.config import config
+from utils.circuit_breaker import llm_circuit_breaker, llm_concurrency_limiter, CircuitOpenError
 import uuid
 import json
+import threading
 from datetime import datetime, timedelta
+from typing import Optional
+
+# Import/init timings in milliseconds, shared by every agent in the process
+startup_timings = {}
+
+
+def _is_registered_name(word: str) -> bool:
+    """True if word is one of the names of a registered patient"""
+    patient = healthcare_api.search_patient(name=word)
+    return patient is not None and word.lower() in patient.name.lower().split()
 
 class ClinicalAgent:
     """LLM-powered function-calling agent for clinical workflow automation"""
@@ -29,10 +47,14 @@ Available functions:
   
 - find_available_slots:  Search for appointment slots
   Args: {{"specialty": "cardiology", "start_date": "2025-12-20", "end_date": "2025-12-27"}}
+  Optional: "page_size" (default 5) and "cursor" (the next_cursor of a previous result) to see later slots
   
 - book_appointment: Book an appointment
   Args: {{"patient_id": "P001", "slot_id": "SLOT-0001", "reason": "Follow-up"}}
 
+- schedule_visits: Find the earliest combined itinerary for several visits (use before booking multiple appointments)
+  Args: {{"patient_id": "P001", "visits": [{{"specialty": "cardiology"}}, {{"specialty": "orthopedics", "after": "cardiology", "same_day": true}}], "start_date": "2025-12-20", "end_date": "2025-12-27"}}
+
 Your response must be a JSON object with this structure:
 {{
   "intent": "schedule_appointment" | "check_insurance" | "search_patient" | "refuse",
@@ -73,37 +95,177 @@ Response:
 }}
 
 Now process this request:
-User: {user_input}
+{session_context}User: {user_input}
 
 Response (JSON only):"""
 
-    def __init__(self):
-        config.validate()
-        
-        print("🔄 Initializing LLM...")
-        
-        llm_endpoint = HuggingFaceEndpoint(
-            repo_id="mistralai/Mistral-7B-Instruct-v0.2",
-            task="conversational",
-            huggingfacehub_api_token=config.API_KEY,
-            max_new_tokens=1024,
-            temperature=0.1,
-        )
-
-        self.llm = ChatHuggingFace(llm=llm_endpoint)
+    def __init__(self, fast_startup: bool = False, use_llm: bool = True):
+        """Build the agent; the LLM endpoint is built eagerly unless fast_startup is set.
         
-        self.prompt = ChatPromptTemplate. from_template(self.SYSTEM_PROMPT)
+        With use_llm=False every request goes through the rule-based workflow
+        and no API key is needed.
+        """
+        init_start = time.perf_counter()
+        if use_llm:
+            config.validate()
         
-        self.json_parser = JsonOutputParser()
+        self.fast_startup = fast_startup
+        self.use_llm = use_llm
+        self._llm = None
+        self._prompt_template = None
+        self._prompts = {}
+        self._json_parser = None
+        self._llm_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._warm_up_thread = None
         
-        self.function_map = {
-            "search_patient": search_patient_func,
-            "check_insurance_eligibility": check_insurance_func,
-            "find_available_slots": find_slots_func,
-            "book_appointment": book_appointment_func
-        }
+        self.function_map = dict(tool_functions)
+        
+        if not use_llm:
+            startup_timings["agent_construct"] = (time.perf_counter() - init_start) * 1000
+        elif fast_startup:
+            startup_timings["agent_construct"] = (time.perf_counter() - init_start) * 1000
+            self.warm_up(background=True)
+        else:
+            self._init_llm()
+            startup_timings["agent_construct"] = (time.perf_counter() - init_start) * 1000
+    
+    def _init_llm(self):
+        """Import the LangChain stack and build the endpoint (runs once)"""
+        with self._llm_lock:
+            if self._llm is not None:
+                return
+            
+            print("🔄 Initializing LLM...")
+            
+            import_start = time.perf_counter()
+            from langchain_core.prompts import ChatPromptTemplate
+            from langchain_core.output_parsers import JsonOutputParser
+            if config.LLM_MODE != "replay":
+                from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+            startup_timings["langchain_import"] = (time.perf_counter() - import_start) * 1000
+            
+            build_start = time.perf_counter()
+            self._prompt_template = ChatPromptTemplate
+            self._prompts[self.SYSTEM_PROMPT] = ChatPromptTemplate.from_template(self.SYSTEM_PROMPT)
+            self._json_parser = JsonOutputParser()
+            
+            if config.LLM_MODE == "replay":
+                print(f"📼 Replaying recorded LLM responses from {config.LLM_CASSETTE_DIR} "
+                      f"(speedup x{config.LLM_REPLAY_SPEEDUP:g})")
+                self._llm = ReplayLLM(LLMCassette(config.LLM_CASSETTE_DIR), config.LLM_REPLAY_SPEEDUP)
+            else:
+                llm_endpoint = HuggingFaceEndpoint(
+                    repo_id="mistralai/Mistral-7B-Instruct-v0.2",
+                    task="conversational",
+                    huggingfacehub_api_token=config.API_KEY,
+                    max_new_tokens=1024,
+                    temperature=0.1,
+                )
+                llm = ChatHuggingFace(llm=llm_endpoint)
+                
+                if config.LLM_MODE == "record":
+                    print(f"📼 Recording LLM responses to {config.LLM_CASSETTE_DIR}")
+                    llm = RecordingLLM(llm, LLMCassette(config.LLM_CASSETTE_DIR))
+                self._llm = llm
+            startup_timings["llm_build"] = (time.perf_counter() - build_start) * 1000
+            
+            print("✅ LLM initialized successfully!")
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._init_llm()
+        return self._llm
+    
+    @property
+    def prompt(self):
+        """Prompt template for the active config snapshot (SYSTEM_PROMPT may be hot-reloaded)"""
+        if self._prompt_template is None:
+            self._init_llm()
+        text = config.SYSTEM_PROMPT or self.SYSTEM_PROMPT
+        template = self._prompts.get(text)
+        if template is None:
+            if len(self._prompts) >= 8:
+                self._prompts.clear()
+            template = self._prompts[text] = self._prompt_template.from_template(text)
+        return template
+    
+    @property
+    def json_parser(self):
+        if self._json_parser is None:
+            self._init_llm()
+        return self._json_parser
+    
+    @property
+    def llm_ready(self) -> bool:
+        """True once warm-up finished (always True for eagerly built agents)"""
+        return self._ready.is_set() or (not self.fast_startup and self._llm is not None)
+    
+    def warm_up(self, background: bool = True):
+        """Build the endpoint and send one priming call so the first real request is fast"""
+        if self._warm_up_thread is not None or self._ready.is_set():
+            return
+        
+        def _run():
+            try:
+                self._init_llm()
+                prime_start = time.perf_counter()
+                self._invoke_llm("Respond with OK.")
+                startup_timings["llm_priming_call"] = (time.perf_counter() - prime_start) * 1000
+            except Exception as e:
+                print(f"⚠️  LLM warm-up failed: {e}")
+            finally:
+                self._ready.set()
         
-        print("✅ LLM initialized successfully!")
+        if background:
+            self._warm_up_thread = threading.Thread(target=_run, name="llm-warm-up", daemon=True)
+            self._warm_up_thread.start()
+        else:
+            _run()
+    
+    def _invoke_llm(self, prompt_text: str):
+        """Call the endpoint through the circuit breaker and adaptive concurrency limit"""
+        llm = self.llm
+        
+        if not llm_concurrency_limiter.acquire(timeout=config.LLM_QUEUE_TIMEOUT_SECONDS):
+            raise CircuitOpenError("LLM endpoint saturated, request shed")
+        
+        if not llm_circuit_breaker.allow_request():
+            llm_concurrency_limiter.release()
+            raise CircuitOpenError("LLM circuit is open")
+        
+        start = time.perf_counter()
+        succeeded = False
+        error = None
+        try:
+            response = llm.invoke(prompt_text)
+            succeeded = True
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            if succeeded:
+                llm_circuit_breaker.record_success(latency)
+                llm_concurrency_limiter.release(latency, success=True)
+            elif error is not None:
+                llm_circuit_breaker.record_failure(latency, error)
+                llm_concurrency_limiter.release(latency, success=False)
+            else:
+                # KeyboardInterrupt or cancellation says nothing about the endpoint:
+                # hand back the probe and the slot without recording an outcome
+                llm_circuit_breaker.record_cancelled()
+                llm_concurrency_limiter.release()
+    
+    def health(self) -> dict:
+        """LLM circuit and concurrency state for monitoring"""
+        return {
+            "llm_ready": self.llm_ready,
+            "llm_circuit": llm_circuit_breaker.snapshot(),
+            "llm_concurrency": llm_concurrency_limiter.snapshot()
+        }
     
     def parse_llm_response(self, response) -> dict:
         """Extract JSON from LLM response"""
@@ -137,14 +299,22 @@ Response (JSON only):"""
                 "actions": []
         }
     
-    def execute_llm_workflow(self, user_input: str) -> list:
+    def execute_llm_workflow(
+        self,
+        user_input: str,
+        session: Optional[Session] = None,
+        idempotency_key: Optional[str] = None,
+        governor: Optional[ExecutionGovernor] = None
+    ) -> list:
         """Use LLM to parse intent and execute workflow"""
         results = []
+        governor = governor or ExecutionGovernor.from_config()
         
         print("\n🤖 LLM is analyzing your request...")
         
-        prompt_text = self.prompt.format(user_input=user_input)
-        llm_response = self.llm.invoke(prompt_text)
+        session_context = session.prompt_context() if session else ""
+        prompt_text = self.prompt.format(user_input=user_input, session_context=session_context)
+        llm_response = self._invoke_llm(prompt_text)
         
         print(f"📝 LLM Response:\n{llm_response}\n")
         
@@ -162,10 +332,14 @@ Response (JSON only):"""
         
         if parsed.get('intent') == 'error':
             print("⚠️ LLM parsing failed, using rule-based fallback")
-            return self. execute_rule_based_workflow(user_input)
+            return self. execute_rule_based_workflow(user_input, session, idempotency_key)
         
         actions = parsed.get('actions', [])
         context = {}
+        # A plan that searches resolves its own patient; never fall back to the previous one
+        plans_search = any(action.get('function') == 'search_patient' for action in actions)
+        if session and session.patient_id and not plans_search:
+            context['patient_id'] = session.patient_id
         
         for i, action in enumerate(actions):
             function_name = action.get('function')
@@ -194,6 +368,18 @@ Response (JSON only):"""
                 print(f"   ⚠️ Unknown function: {function_name}")
                 continue
             
+            exceeded = governor.admit(function_name, args)
+            if exceeded:
+                message = f"Execution budget exceeded ({exceeded['budget']}): {exceeded['detail']}"
+                print(f"   ⛔ {message}; cancelling {len(actions) - i} remaining step(s)")
+                results.append({"function": function_name, "result": {"error": message, "budget": exceeded['budget']}})
+                break
+            
+            if function_name == "find_available_slots":
+                page_size = args.get('page_size', 5)
+                if isinstance(page_size, int) and page_size > governor.remaining_rows():
+                    args['page_size'] = governor.remaining_rows()
+            
             try: 
                 if 'start_date' in args and ('XX' in str(args.get('start_date', '')) or 'YY' in str(args.get('end_date', ''))):
                     start = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
@@ -201,17 +387,37 @@ Response (JSON only):"""
                     args['start_date'] = start
                     args['end_date'] = end
                 
-                result = func(**args)
+                if function_name == "book_appointment" and idempotency_key:
+                    args['idempotency_key'] = f"{idempotency_key}:{args.get('patient_id')}:{args.get('slot_id')}"
+                
+                cached = session.cached_search(**args) if session and function_name == "search_patient" else None
+                if cached:
+                    result = cached
+                    print(f"   ♻️ Reusing patient {result['id']} from session")
+                else:
+                    result = func(**args)
                 results.append({"function": function_name, "result":  result})
+                governor.record(result)
+                if session:
+                    session.remember(function_name, result)
                 
                 if function_name == "search_patient" and "id" in result and not result. get("error"):
                     context['patient_id'] = result['id']
                     print(f"   💾 Stored patient_id = {context['patient_id']}")
+                elif function_name == "search_patient":
+                    context.pop('patient_id', None)
+                    if session:
+                        session.forget_patient()
+                    print("   🚫 Patient not resolved; later steps will not use a previous patient_id")
                 
                 if function_name == "find_available_slots" and "slots" in result and result['slots']:
                     context['slot_id'] = result['slots'][0]['slot_id']
                     print(f"   💾 Stored slot_id = {context['slot_id']}")
                 
+                if function_name == "schedule_visits" and result.get("visits"):
+                    context['slot_id'] = result['visits'][0]['slot_id']
+                    print(f"   💾 Stored slot_id = {context['slot_id']} (first visit of itinerary)")
+                
                 print(f"   ✅ Success: {function_name}")
                 
             except Exception as e:
@@ -220,7 +426,12 @@ Response (JSON only):"""
     
         return results
     
-    def execute_rule_based_workflow(self, user_input: str) -> list:
+    def execute_rule_based_workflow(
+        self,
+        user_input: str,
+        session: Optional[Session] = None,
+        idempotency_key: Optional[str] = None
+    ) -> list:
         """Fallback:  Rule-based workflow (your current implementation)"""
         print("⚠️  Using rule-based fallback (LLM failed)")
         
@@ -241,10 +452,21 @@ Response (JSON only):"""
             patient_id = patient_id_match.group().upper()
         
         if patient_name or patient_id:
-            result = search_patient_func(name=patient_name, patient_id=patient_id)
+            result = session.cached_search(patient_name, patient_id) if session else None
+            if not result:
+                result = search_patient_func(name=patient_name, patient_id=patient_id)
+                if session:
+                    session.forget_patient()
+                    session.remember("search_patient", result)
             results.append({"function": "search_patient", "result": result})
-            if "id" in result:
-                patient_id = result["id"]
+            patient_id = result.get("id") if not result.get("error") else None
+        elif session and session.patient_id:
+            if refers_to_previous_patient(user_input, _is_registered_name):
+                # Follow-up turn ("now check his insurance"): reuse the resolved patient
+                patient_id = session.patient_id
+            elif names_patient(user_input, _is_registered_name):
+                # Someone this router cannot resolve is named; never book for the previous patient
+                session.forget_patient()
         
         if patient_id and ("insurance" in input_lower or "eligibility" in input_lower):
             result = check_insurance_func(patient_id)
@@ -255,6 +477,8 @@ Response (JSON only):"""
             specialty = "cardiology"
         elif "ortho" in input_lower: 
             specialty = "orthopedics"
+        elif session and session.last_specialty:
+            specialty = session.last_specialty
         
         if specialty and ("appointment" in input_lower or "schedule" in input_lower):
             start_date = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
@@ -262,17 +486,64 @@ Response (JSON only):"""
             
             result = find_slots_func(specialty, start_date, end_date)
             results.append({"function": "find_available_slots", "result": result})
+            if session:
+                session.remember("find_available_slots", result)
             
             if patient_id and result. get("slots"):
                 slot_id = result["slots"][0]["slot_id"]
-                booking = book_appointment_func(patient_id, slot_id, f"{specialty} follow-up")
+                booking = book_appointment_func(
+                    patient_id, slot_id, f"{specialty} follow-up",
+                    idempotency_key=f"{idempotency_key}:{patient_id}:{slot_id}" if idempotency_key else None
+                )
                 results.append({"function": "book_appointment", "result": booking})
+                if session:
+                    session.remember("book_appointment", booking)
         
         return results
     
-    def process_request(self, user_input: str) -> dict:
-        """Process a clinical workflow request using LLM"""
+    def process_request(
+        self,
+        user_input: str,
+        session_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> dict:
+        """Process a clinical workflow request using LLM.
+        
+        Requests sharing a session_id reuse the patient and slots resolved by
+        earlier turns instead of looking them up again. Repeating an
+        idempotency_key returns the stored result (or joins the in-flight
+        run) instead of re-planning and re-booking.
+        """
+        if not idempotency_key:
+            with config.pinned():
+                return self._process_request(user_input, session_id)
+        
+        def _run():
+            with config.pinned():
+                return self._process_request(user_input, session_id, idempotency_key)
+        
+        try:
+            result, replayed = idempotency_store.run(
+                f"request:{idempotency_key}", _run,
+                should_store=lambda result: result["status"] != "error",
+                fingerprint=request_fingerprint(user_input, session_id)
+            )
+        except IdempotencyKeyConflict as e:
+            return {"status": "error", "error": str(e), "idempotency_key": idempotency_key}
+        if replayed:
+            print(f"♻️ Returning stored result for idempotency key {idempotency_key}")
+            return {**result, "idempotent_replay": True}
+        return result
+    
+    def _process_request(
+        self,
+        user_input: str,
+        session_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> dict:
         request_id = str(uuid.uuid4())[:8]
+        session = session_store.get(session_id) if session_id else None
+        governor = ExecutionGovernor.from_config()
         
         audit_logger.log_request(user_input, request_id)
         
@@ -286,12 +557,21 @@ Response (JSON only):"""
             }
         
         try:
-            try:
-                results = self.execute_llm_workflow(user_input)
-            except Exception as e:
-                print(f"⚠️  LLM workflow failed: {e}")
-                results = self.execute_rule_based_workflow(user_input)
-            
+            if not self.use_llm:
+                results = self.execute_rule_based_workflow(user_input, session, idempotency_key)
+            elif self.fast_startup and not self.llm_ready:
+                print("⚡ LLM still warming up, routing to rule-based workflow")
+                results = self.execute_rule_based_workflow(user_input, session, idempotency_key)
+            elif llm_circuit_breaker.is_open():
+                print("⚡ LLM circuit open, routing to rule-based workflow")
+                results = self.execute_rule_based_workflow(user_input, session, idempotency_key)
+            else:
+                try:
+                    results = self.execute_llm_workflow(user_input, session, idempotency_key, governor)
+                except Exception as e:
+                    print(f"⚠️  LLM workflow failed: {e}")
+                    results = self.execute_rule_based_workflow(user_input, session, idempotency_key)
+
             if results and results[0]. get("function") == "refusal":
                 return {
                     "status":  "refused",
@@ -306,12 +586,16 @@ Response (JSON only):"""
                     "request_id": request_id
                 }
             
-            return {
+            response = {
                 "status": "success",
                 "workflow_results": results,
                 "summary": self. generate_summary(results),
                 "request_id": request_id
             }
+            if governor.exceeded:
+                audit_logger.log_error(f"Execution budget exceeded: {governor.exceeded}", request_id)
+                response["budget_exceeded"] = governor.report()
+            return response
             
         except Exception as e:
             error_msg = f"Agent execution failed: {str(e)}"
@@ -353,6 +637,14 @@ Response (JSON only):"""
                     first_slot = slots[0]
                     summary.append(f"  Next available: {first_slot['start_time']} with {first_slot['provider']}")
             
+            elif func_name == "schedule_visits":
+                visits = result.get("visits", [])
+                summary.append(f"✓ Found itinerary with {len(visits)} visit(s)")
+                for visit in visits:
+                    summary.append(f"  {visit['start_time']}: {visit['specialty']} with {visit['provider']}")
+                if visits and not result.get("same_day_satisfied", True):
+                    summary.append("  Note: same-day preference could not be met")
+            
             elif func_name == "book_appointment": 
                 if "appointment_id" in result:
                     summary.append(f"✓ Appointment booked successfully!")
@@ -364,6 +656,10 @@ Response (JSON only):"""
         
         return "\n".join(summary) if summary else "No actions completed"
 
-def create_agent():
+def create_agent(fast_startup: bool = None, use_llm: bool = True):
     """Factory function to create agent instance"""
-    return ClinicalAgent()
\ No newline at end of file
+    if fast_startup is None:
+        fast_startup = config.FAST_STARTUP
+    return ClinicalAgent(fast_startup=fast_startup, use_llm=use_llm)
+
+startup_timings["import_agent_module"] = (time.perf_counter() - _MODULE_LOAD_START) * 1000
\ No newline at end of file
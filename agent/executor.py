@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+from typing import Iterable, Iterator, List, Optional
+import multiprocessing
+import os
+import sys
+
+# Per-process state, set up once by _init_worker in each pool worker
+_worker_agent = None
+_warm_up_barrier = None
+
+
+def _init_worker(worker_counter, warm_up_barrier, fast_startup: bool, use_llm: bool, quiet: bool):
+    """Give this worker its own agent and healthcare API replica"""
+    global _worker_agent, _warm_up_barrier
+    _warm_up_barrier = warm_up_barrier
+
+    if quiet:
+        devnull = open(os.devnull, "w")
+        sys.stdout = devnull
+        sys.stderr = devnull
+
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value
+        worker_counter.value += 1
+
+    from agent.clinical_agent import create_agent
+    from api.mock_healthcare_api import healthcare_api
+    from utils.config import config
+
+    # The import-time backend of a child process never journals (the parent
+    # owns JOURNAL_DIR); each replica journals to a directory of its own
+    if config.JOURNAL_DIR:
+        healthcare_api.open_journal(os.path.join(config.JOURNAL_DIR, f"worker-{worker_index}"))
+
+    # Workers share nothing, so keep appointment IDs from colliding across replicas
+    healthcare_api.offset_appointment_counter(worker_index * 1_000_000)
+
+    _worker_agent = create_agent(fast_startup=fast_startup, use_llm=use_llm)
+
+
+def _wait_for_all_workers(timeout: float) -> int:
+    # Held until every worker is running one of these, so each must have spawned and initialised
+    _warm_up_barrier.wait(timeout)
+    return os.getpid()
+
+
+def _run_request(user_input: str) -> dict:
+    result = _worker_agent.process_request(user_input)
+    result["worker_pid"] = os.getpid()
+    return result
+
+
+class ProcessPoolRequestExecutor:
+    """Fans process_request calls out to a pool of single-agent worker processes.
+
+    Every worker builds its own ClinicalAgent and MockHealthcareAPI replica
+    on startup; results come back through the pool's futures.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        fast_startup: bool = True,
+        use_llm: bool = True,
+        quiet: bool = False
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Spawn rather than fork so workers never inherit the parent's
+        # singletons (API state, configured log handlers, LLM clients)
+        context = multiprocessing.get_context("spawn")
+        self._worker_counter = context.Value("i", 0)
+        self._warm_up_barrier = context.Barrier(self.max_workers)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._worker_counter, self._warm_up_barrier, fast_startup, use_llm, quiet)
+        )
+
+    def warm_up(self, timeout: float = 120.0) -> int:
+        """Block until all max_workers workers have spawned and run their initializer.
+
+        Returns the number of distinct worker processes that checked in.
+        """
+        # No worker goes idle while its task waits at the barrier, so the
+        # pool has to start a new process for every one of these
+        futures = [self._pool.submit(_wait_for_all_workers, timeout) for _ in range(self.max_workers)]
+        return len({future.result() for future in futures})
+
+    def submit(self, user_input: str) -> Future:
+        """Queue one request; the future resolves to the process_request result"""
+        return self._pool.submit(_run_request, user_input)
+
+    def map(self, user_inputs: Iterable[str], chunksize: int = 1) -> List[dict]:
+        """Run requests in parallel and return results in input order"""
+        return list(self._pool.map(_run_request, user_inputs, chunksize=chunksize))
+
+    def iter_completed(self, user_inputs: Iterable[str]) -> Iterator[tuple[int, dict]]:
+        """Yield (input_index, result) pairs as soon as each request finishes"""
+        futures = {self.submit(user_input): i for i, user_input in enumerate(user_inputs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
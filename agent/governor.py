@@ -0,0 +1,91 @@
+from typing import Optional
+from agent.tool_schema import parse_date
+from utils.config import config
+import time
+
+
+class ExecutionGovernor:
+    """Per-request budget for LLM-planned workflows.
+
+    Limits the number of actions, wall-clock time since the request started,
+    the span of any requested date range and the total rows returned by
+    tools. The first budget to run out stops the remaining steps.
+    """
+
+    def __init__(
+        self,
+        max_actions: int,
+        deadline_seconds: float,
+        max_date_range_days: int,
+        max_rows: int
+    ):
+        self.max_actions = max_actions
+        self.deadline_seconds = deadline_seconds
+        self.max_date_range_days = max_date_range_days
+        self.max_rows = max_rows
+
+        self.started = time.monotonic()
+        self.actions = 0
+        self.rows = 0
+        self.exceeded: Optional[dict] = None
+
+    @classmethod
+    def from_config(cls) -> "ExecutionGovernor":
+        return cls(
+            max_actions=config.MAX_FUNCTION_CALLS,
+            deadline_seconds=config.REQUEST_DEADLINE_SECONDS,
+            max_date_range_days=config.MAX_DATE_RANGE_DAYS,
+            max_rows=config.MAX_RESULT_ROWS
+        )
+
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining_rows(self) -> int:
+        return max(0, self.max_rows - self.rows)
+
+    def admit(self, function_name: str, args: dict) -> Optional[dict]:
+        """Charge one action; returns the exceeded budget (and stops admitting) or None"""
+        if self.exceeded:
+            return self.exceeded
+
+        if self.actions >= self.max_actions:
+            return self._exceed("max_actions", f"plan has more than {self.max_actions} actions")
+
+        if self.elapsed_seconds() >= self.deadline_seconds:
+            return self._exceed("deadline", f"request ran past its {self.deadline_seconds:g}s deadline")
+
+        if self.rows >= self.max_rows:
+            return self._exceed("result_rows", f"tools already returned {self.rows} rows (limit {self.max_rows})")
+
+        try:
+            span = (parse_date(args["end_date"]) - parse_date(args["start_date"])).days
+        except (KeyError, TypeError, ValueError):
+            span = None  # Nothing to measure, or malformed dates the validator will reject
+        if span is not None and span > self.max_date_range_days:
+            return self._exceed(
+                "date_range",
+                f"{function_name} spans {span} days (limit {self.max_date_range_days})"
+            )
+
+        self.actions += 1
+        return None
+
+    def record(self, result: dict):
+        """Count rows a tool returned against the row budget"""
+        if isinstance(result, dict):
+            for key in ("slots", "visits", "candidates"):
+                if isinstance(result.get(key), list):
+                    self.rows += len(result[key])
+
+    def _exceed(self, budget: str, detail: str) -> dict:
+        self.exceeded = {"budget": budget, "detail": detail}
+        return self.exceeded
+
+    def report(self) -> dict:
+        return {
+            "actions": self.actions,
+            "rows": self.rows,
+            "elapsed_seconds": round(self.elapsed_seconds(), 3),
+            "exceeded": self.exceeded
+        }
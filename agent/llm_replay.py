@@ -0,0 +1,114 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from utils.audit_logger import audit_logger
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ReplayMissError(LookupError):
+    """No recording exists for the prompt being replayed"""
+
+
+class LLMCassette:
+    """Content-addressed store of prompt -> raw LLM response recordings.
+
+    Each recording lives at <directory>/<sha[:2]>/<sha>.json, keyed by the
+    SHA-256 of the exact prompt text, so identical prompts share one entry.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def save(self, prompt: str, response_text: str, latency_seconds: float):
+        key = self.key(prompt)
+        path = self._path(key)
+        record = {
+            "key": key,
+            "prompt": prompt,
+            "response": response_text,
+            "latency_seconds": latency_seconds,
+            "recorded_at": datetime.now().isoformat()
+        }
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique per writer: other processes may record the same prompt
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(record, f)
+                os.replace(tmp_path, path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+
+    def load(self, prompt: str) -> Optional[dict]:
+        path = self._path(self.key(prompt))
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+
+class ReplayedResponse:
+    """Stand-in for the chat message object; parse_llm_response only reads .content"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+    def __str__(self):
+        return f"content={self.content!r}"
+
+
+def _response_text(response) -> str:
+    return response.content if hasattr(response, "content") else str(response)
+
+
+class RecordingLLM:
+    """Wraps a live LLM and records every prompt, raw response and latency"""
+
+    def __init__(self, llm, cassette: LLMCassette):
+        self.llm = llm
+        self.cassette = cassette
+
+    def invoke(self, prompt: str):
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt)
+        try:
+            self.cassette.save(str(prompt), _response_text(response), time.perf_counter() - start)
+        except (OSError, TypeError, ValueError) as e:
+            # A failed recording must not fail the live call it was recording
+            audit_logger.log_error(f"Could not record LLM response: {e}", "llm_replay")
+        return response
+
+
+class ReplayLLM:
+    """Serves recorded responses offline, sleeping latency / speedup per call.
+
+    speedup=1 reproduces the recorded latencies, 10 replays ten times
+    faster, and 0 skips the delay entirely.
+    """
+
+    def __init__(self, cassette: LLMCassette, speedup: float = 1.0):
+        self.cassette = cassette
+        self.speedup = speedup
+
+    def invoke(self, prompt: str) -> ReplayedResponse:
+        record = self.cassette.load(str(prompt))
+        if record is None:
+            raise ReplayMissError(f"No recorded response for prompt {LLMCassette.key(str(prompt))[:12]}")
+
+        if self.speedup > 0:
+            time.sleep(record["latency_seconds"] / self.speedup)
+        return ReplayedResponse(record["response"])
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from typing import Dict, List, Optional
+from api.mock_healthcare_api import healthcare_api
+from api.schemas import VisitRequest, Itinerary, TimeSlot
+import heapq
+
+
+class ItineraryScheduler:
+    """Best-first search for the earliest feasible multi-visit itinerary.
+    
+    Partial itineraries are ordered by (same-day misses, finish time), so the
+    first complete one popped is optimal. ``same_day`` is a soft constraint:
+    visits are split across days only when no same-day itinerary exists.
+    
+    Partial itineraries that place the same number of visits, with the same
+    misses, first day and finish day, are treated as equivalent and only the
+    earliest-finishing one is expanded; without this an infeasible same-day
+    request enumerates every slot combination in the range.
+    """
+    
+    def __init__(self, api, max_candidates_per_visit: int = 200, max_expansions: int = 5000, page_size: int = 50):
+        self.api = api
+        self.page_size = page_size
+        self.max_candidates_per_visit = max_candidates_per_visit
+        self.max_expansions = max_expansions
+
+    def _resolve_order(self, visits: List[VisitRequest]) -> tuple[List[int], Dict[int, Optional[int]]]:
+        """Map each visit to its predecessor and return a dependency-respecting order"""
+        by_specialty = {}
+        for i, visit in enumerate(visits):
+            by_specialty.setdefault(visit.specialty.lower(), i)
+
+        predecessor = {}
+        for i, visit in enumerate(visits):
+            if visit.after is None:
+                predecessor[i] = None
+                continue
+            ref = visit.after.strip().lower()
+            if ref.isdigit() and int(ref) < len(visits):
+                predecessor[i] = int(ref)
+            elif ref in by_specialty:
+                predecessor[i] = by_specialty[ref]
+            else:
+                raise ValueError(f"Visit '{visit.specialty}' must follow unknown visit '{visit.after}'")
+            if predecessor[i] == i:
+                raise ValueError(f"Visit '{visit.specialty}' cannot follow itself")
+
+        order = []
+        placed = set()
+        while len(order) < len(visits):
+            ready = [i for i in range(len(visits))
+                     if i not in placed and (predecessor[i] is None or predecessor[i] in placed)]
+            if not ready:
+                raise ValueError("Visit ordering constraints contain a cycle")
+            for i in ready:
+                order.append(i)
+                placed.add(i)
+
+        return order, predecessor
+
+    def _candidates(self, visit: VisitRequest, start_date: str, end_date: str) -> List[TimeSlot]:
+        """Slots long enough for the visit, earliest first, fetched a page at a time"""
+        duration = timedelta(minutes=visit.duration_minutes)
+        candidates = []
+        cursor = None
+        while True:
+            page = self.api.find_available_slots_page(
+                visit.specialty, start_date, end_date, visit.provider,
+                page_size=self.page_size, cursor=cursor
+            )
+            for slot in page.slots:
+                if slot.end_time - slot.start_time >= duration:
+                    candidates.append(slot)
+                    if len(candidates) >= self.max_candidates_per_visit:
+                        return candidates
+            if not page.next_cursor:
+                return candidates
+            cursor = page.next_cursor
+
+    def find_itinerary(
+        self,
+        patient_id: str,
+        visits: List[VisitRequest],
+        start_date: str,
+        end_date: str
+    ) -> Optional[Itinerary]:
+        """Return the earliest feasible itinerary, or None if the visits cannot all be fitted"""
+        if not visits:
+            raise ValueError("At least one visit is required")
+
+        order, predecessor = self._resolve_order(visits)
+        candidates = {i: self._candidates(visits[i], start_date, end_date) for i in order}
+        if any(not slots for slots in candidates.values()):
+            return None
+
+        # Heap entries: (violations, finish, first_start, tiebreak, assignment)
+        # where assignment maps positions in ``order`` to chosen slots.
+        counter = 0
+        heap = [(0, None, None, counter, ())]
+        expansions = 0
+        # (depth, violations, first day, finish day) -> earliest finish pushed
+        frontier: Dict[tuple, object] = {}
+        expanded = set()
+
+        while heap:
+            violations, finish, first_start, _, assignment = heapq.heappop(heap)
+            depth = len(assignment)
+
+            if depth == len(order):
+                chosen = {order[pos]: slot for pos, slot in enumerate(assignment)}
+                ordered_slots = [chosen[i] for i in range(len(visits))]
+                return Itinerary(
+                    patient_id=patient_id,
+                    visits=ordered_slots,
+                    same_day_satisfied=violations == 0,
+                    starts_at=first_start,
+                    ends_at=finish
+                )
+
+            if assignment:
+                state = (depth, violations, assignment[0].start_time.date(), finish.date())
+                if state in expanded:
+                    continue
+                expanded.add(state)
+
+            expansions += 1
+            if expansions > self.max_expansions:
+                break
+
+            placed = {order[pos]: slot for pos, slot in enumerate(assignment)}
+            visit_index = order[depth]
+            visit = visits[visit_index]
+            before = placed.get(predecessor[visit_index])
+            anchor = before if before is not None else (assignment[0] if assignment else None)
+            duration = timedelta(minutes=visit.duration_minutes)
+
+            for slot in candidates[visit_index]:
+                if before is not None and slot.start_time < before.end_time:
+                    continue
+
+                visit_end = slot.start_time + duration
+                if any(slot.start_time < other.end_time and other.start_time < visit_end
+                       for other in placed.values()):
+                    continue
+
+                penalty = 0
+                if visit.same_day and anchor is not None and slot.start_time.date() != anchor.start_time.date():
+                    penalty = 1
+
+                new_finish = visit_end if finish is None else max(finish, visit_end)
+                first_day = (assignment[0] if assignment else slot).start_time.date()
+                state = (depth + 1, violations + penalty, first_day, new_finish.date())
+                if state in frontier and frontier[state] <= new_finish:
+                    continue
+                frontier[state] = new_finish
+
+                counter += 1
+                heapq.heappush(heap, (
+                    violations + penalty,
+                    new_finish,
+                    slot.start_time if first_start is None else min(first_start, slot.start_time),
+                    counter,
+                    assignment + (slot,)
+                ))
+
+        return None
+
+
+scheduler = ItineraryScheduler(healthcare_api)
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from typing import Callable, Optional
+from utils.config import config
+import re
+import threading
+import time
+
+# Words that introduce the patient a turn is about: "for Amit Singh", "patient Neha"
+_PATIENT_CONTEXT_WORDS = {"for", "patient", "named", "called"}
+_TITLES = {"dr", "mr", "mrs", "ms", "miss", "prof"}
+# Capitalised words that are never a patient's name
+_NOT_PATIENT_NAMES = {
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "today", "tomorrow", "next",
+    "cardiology", "orthopedics", "general", "neurology", "dermatology", "pediatrics", "oncology",
+    "dr", "mr", "mrs", "ms", "miss", "prof", "doctor", "i",
+}
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]*")
+_PATIENT_ID = re.compile(r"\bP\d{3,}\b")
+# "his insurance", "book it for her", "the patient": the turn points back at the last one
+_PATIENT_BACK_REFERENCE = re.compile(
+    r"\b(?:he|she|him|her|his|hers|they|them|their|(?:the|this|that|same) patient)\b", re.IGNORECASE
+)
+
+
+def names_patient(user_input: str, is_registered_name: Optional[Callable[[str], bool]] = None) -> bool:
+    """True when the turn names a patient: a patient ID, a capitalised name after
+    "for"/"patient", or (given is_registered_name) a word matching a registered patient.
+    Weekdays, months, specialties and words following a title ("Dr. Mehta") never count.
+    """
+    if _PATIENT_ID.search(user_input):
+        return True
+
+    previous = ""
+    for match in _WORD.finditer(user_input):
+        word = match.group()
+        lower = word.lower()
+        if word[0].isupper() and lower not in _NOT_PATIENT_NAMES and previous not in _TITLES:
+            if previous in _PATIENT_CONTEXT_WORDS:
+                return True
+            if is_registered_name and is_registered_name(word):
+                return True
+        previous = lower
+    return False
+
+
+def refers_to_previous_patient(
+    user_input: str,
+    is_registered_name: Optional[Callable[[str], bool]] = None
+) -> bool:
+    """True only when the turn names no patient and clearly points back at one"""
+    return not names_patient(user_input, is_registered_name) and bool(_PATIENT_BACK_REFERENCE.search(user_input))
+
+
+class Session:
+    """Entities resolved earlier in a conversation, reused by later turns"""
+
+    MAX_REMEMBERED_SLOTS = 5
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.patient_id: Optional[str] = None
+        self.patient_record: Optional[dict] = None
+        self.last_slots: list = []
+        self.last_specialty: Optional[str] = None
+        self.last_active = time.monotonic()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    @property
+    def patient_name(self) -> Optional[str]:
+        return self.patient_record.get("name") if self.patient_record else None
+
+    def remember(self, function_name: str, result: dict):
+        """Record the entities a successful tool call resolved"""
+        if not isinstance(result, dict) or result.get("error") or result.get("dry_run"):
+            return
+
+        if function_name == "search_patient" and "id" in result:
+            self.patient_id = result["id"]
+            self.patient_record = result
+
+        elif function_name == "find_available_slots" and result.get("slots"):
+            self.last_slots = result["slots"][:self.MAX_REMEMBERED_SLOTS]
+            self.last_specialty = result["slots"][0]["specialty"]
+
+        elif function_name == "schedule_visits" and result.get("visits"):
+            self.last_slots = result["visits"][:self.MAX_REMEMBERED_SLOTS]
+
+        elif function_name == "book_appointment" and "appointment_id" in result:
+            booked = result.get("notes", "")
+            self.last_slots = [slot for slot in self.last_slots if f"Slot ID: {slot['slot_id']}" != booked]
+
+    def forget_patient(self):
+        """Drop the resolved patient once the conversation moves to someone else"""
+        self.patient_id = None
+        self.patient_record = None
+
+    def cached_search(self, name: Optional[str] = None, patient_id: Optional[str] = None) -> Optional[dict]:
+        """Return the stored patient record if it answers this search"""
+        if not self.patient_record:
+            return None
+        if patient_id and patient_id.upper() == self.patient_id:
+            return self.patient_record
+        if name and self.patient_name and name.lower() in self.patient_name.lower():
+            return self.patient_record
+        return None
+
+    def prompt_context(self) -> str:
+        """Short prompt section describing what this conversation already resolved"""
+        lines = []
+        if self.patient_id:
+            lines.append(
+                f"- Current patient: {self.patient_name} (patient_id {self.patient_id}). "
+                "Use this patient_id directly and do not call search_patient for this patient."
+            )
+        if self.last_specialty:
+            lines.append(f"- Last specialty discussed: {self.last_specialty}")
+        if self.last_slots:
+            lines.append(f"- Last offered slot: {self.last_slots[0]['slot_id']} at {self.last_slots[0]['start_time']}")
+
+        if not lines:
+            return ""
+        return "Conversation context:\n" + "\n".join(lines) + "\n\n"
+
+
+class SessionStore:
+    """Bounded LRU store of conversation sessions with idle eviction"""
+
+    def __init__(self, max_sessions: int = 1000, idle_timeout_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Session:
+        """Return the session for this id, creating it if needed"""
+        with self._lock:
+            self._evict_idle()
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            session.touch()
+            return session
+
+    def end(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_idle(self):
+        # Sessions are kept in least-recently-used order, so stop at the first fresh one
+        cutoff = time.monotonic() - self.idle_timeout_seconds
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if oldest.last_active >= cutoff:
+                break
+            del self._sessions[oldest_id]
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+session_store = SessionStore(config.SESSION_MAX_ENTRIES, config.SESSION_IDLE_TIMEOUT_SECONDS)
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Union, get_args, get_origin
+from api.schemas import VisitRequest
+from utils.config import config
+import inspect
+import re
+
+PATIENT_ID_PATTERN = re.compile(r'^P\d{3,}$')
+
+
+class ArgumentError(ValueError):
+    """Tool call arguments failed validation"""
+
+
+@lru_cache(maxsize=1024)
+def parse_date(value: str) -> date:
+    """YYYY-MM-DD -> date, memoized since plans keep reusing the same few dates"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _parse_patient_id(value: Any) -> str:
+    if not isinstance(value, str) or not PATIENT_ID_PATTERN.match(value):
+        raise ArgumentError("Invalid patient_id format.  Expected format: P001")
+    return value
+
+
+def _parse_date_argument(value: Any) -> date:
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(value)
+    except (TypeError, ValueError):
+        raise ArgumentError("Dates must be in YYYY-MM-DD format")
+
+
+def _parse_page_size(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= config.MAX_SLOT_PAGE_SIZE:
+        raise ArgumentError(f"page_size must be between 1 and {config.MAX_SLOT_PAGE_SIZE}")
+    return value
+
+
+def _parse_visits(value: Any) -> List[VisitRequest]:
+    if not value or not isinstance(value, list):
+        raise ArgumentError("visits must be a non-empty list")
+
+    visits = []
+    for visit in value:
+        if isinstance(visit, VisitRequest):
+            visits.append(visit)
+            continue
+        if not isinstance(visit, dict) or not visit.get("specialty"):
+            raise ArgumentError("Each visit must include a specialty")
+        try:
+            visits.append(VisitRequest(**visit))
+        except (TypeError, ValueError) as e:
+            raise ArgumentError(f"Invalid visit: {e}")
+    return visits
+
+
+# Parsers by parameter name; they apply to every tool that takes the parameter
+FIELD_PARSERS: Dict[str, Callable[[Any], Any]] = {
+    "patient_id": _parse_patient_id,
+    "start_date": _parse_date_argument,
+    "end_date": _parse_date_argument,
+    "page_size": _parse_page_size,
+    "visits": _parse_visits,
+}
+
+
+def _check_name_or_patient_id(args: Dict[str, Any]):
+    if not args["name"] and not args["patient_id"]:
+        raise ArgumentError("Either 'name' or 'patient_id' must be provided")
+
+
+def _check_date_range(args: Dict[str, Any]):
+    if args["start_date"] > args["end_date"]:
+        raise ArgumentError("start_date must be before end_date")
+    if args["start_date"] <= date.today():
+        raise ArgumentError("Cannot book appointments in the past")
+
+
+# Cross-field checks, applied to tools whose signature has all of the named parameters
+RULES = [
+    ({"name", "patient_id"}, _check_name_or_patient_id),
+    ({"start_date", "end_date"}, _check_date_range),
+]
+
+
+def _accepted_types(annotation: Any) -> tuple:
+    """Runtime types an annotation admits (Optional[str] -> str, List[dict] -> list)"""
+    if annotation is inspect.Parameter.empty:
+        return (object,)
+    origin = get_origin(annotation)
+    if origin is Union:
+        return tuple(t for arg in get_args(annotation) if arg is not type(None) for t in _accepted_types(arg))
+    return (origin or annotation,)
+
+
+@dataclass(frozen=True)
+class ToolParameter:
+    name: str
+    required: bool
+    default: Any
+    types: tuple
+    parser: Optional[Callable[[Any], Any]]
+
+
+class ToolSchema:
+    """Argument schema compiled once from a tool function's signature.
+
+    parse() rejects unknown arguments, checks required ones and annotated
+    types, converts values with the parser registered for the parameter name
+    (patient IDs, dates, page sizes, visit lists) and runs the cross-field
+    rules that apply. It returns typed values with defaults filled in, so
+    nothing downstream needs to parse them again.
+    """
+
+    def __init__(self, name: str, func: Callable):
+        self.name = name
+        self.parameters = {}
+        for parameter in inspect.signature(func).parameters.values():
+            required = parameter.default is inspect.Parameter.empty
+            self.parameters[parameter.name] = ToolParameter(
+                name=parameter.name,
+                required=required,
+                default=None if required else parameter.default,
+                types=_accepted_types(parameter.annotation),
+                parser=FIELD_PARSERS.get(parameter.name)
+            )
+        self.rules = [check for names, check in RULES if names <= self.parameters.keys()]
+
+    def parse(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        unexpected = args.keys() - self.parameters.keys()
+        if unexpected:
+            raise ArgumentError(f"Unexpected argument(s) for {self.name}: {', '.join(sorted(unexpected))}")
+
+        parsed = {}
+        for name, parameter in self.parameters.items():
+            value = args.get(name, parameter.default)
+            if value is None or value == "":
+                if parameter.required:
+                    raise ArgumentError(f"{name} is required")
+                parsed[name] = value
+            elif parameter.parser:
+                parsed[name] = parameter.parser(value)
+            elif isinstance(value, parameter.types):
+                parsed[name] = value
+            else:
+                type_names = " or ".join(t.__name__ for t in parameter.types)
+                raise ArgumentError(f"{name} must be of type {type_names}")
+
+        for check in self.rules:
+            check(parsed)
+        return parsed
+
+
+def compile_tool_schemas(function_map: Dict[str, Callable]) -> Dict[str, ToolSchema]:
+    return {name: ToolSchema(name, func) for name, func in function_map.items()}
@@ -1,9 +1,11 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Optional, List
 from api.mock_healthcare_api import healthcare_api
-from agent.validators import validator as input_validator
+from agent.scheduler import scheduler
+from agent.tool_schema import ArgumentError, compile_tool_schemas
 from utils.audit_logger import audit_logger
 from utils.config import config
+from utils.idempotency import idempotency_store, request_fingerprint, IdempotencyKeyConflict
 import uuid
 
 
@@ -13,10 +15,11 @@ def search_patient_func(name: Optional[str] = None, patient_id: Optional[str] =
     
     args = {"name": name, "patient_id": patient_id}
     
-    is_valid, message = input_validator. validate_search_patient(args)
-    if not is_valid:  
-        audit_logger.log_error(f"Validation failed: {message}", request_id)
-        return {"error": message}
+    try:
+        tool_schemas["search_patient"].parse(args)
+    except ArgumentError as e:
+        audit_logger.log_error(f"Validation failed: {e}", request_id)
+        return {"error": str(e)}
     
     audit_logger.log_function_call("search_patient", args, request_id, config.DRY_RUN_MODE)
     
@@ -30,8 +33,20 @@ def search_patient_func(name: Optional[str] = None, patient_id: Optional[str] =
             result_dict = result. model_dump()
             audit_logger.log_function_result("search_patient", result_dict, request_id)
             return result_dict
-        else: 
-            return {"error": "Patient not found"}
+        
+        if name:
+            # LLM-extracted names often carry typos or transliteration variants. A
+            # similar name may be a different person, so never bind one: offer the
+            # ranked candidates and leave confirmation (by patient_id) to the user
+            matches = healthcare_api.search_patients_fuzzy(name, limit=3, min_score=config.FUZZY_MATCH_MIN_SCORE)
+            if matches:
+                suggestions = ", ".join(f"{m.patient.name} ({m.patient.id})" for m in matches)
+                return {
+                    "error": f"Patient not found. Did you mean: {suggestions}? Confirm by patient_id.",
+                    "candidates": [{**m.patient.model_dump(), "match_score": m.score} for m in matches]
+                }
+        
+        return {"error": "Patient not found"}
             
     except Exception as e:
         audit_logger.log_error(str(e), request_id)
@@ -43,10 +58,11 @@ def check_insurance_func(patient_id: str) -> dict:
     
     args = {"patient_id":  patient_id}
     
-    is_valid, message = input_validator.validate_check_insurance(args)
-    if not is_valid: 
-        audit_logger. log_error(f"Validation failed: {message}", request_id)
-        return {"error": message}
+    try:
+        tool_schemas["check_insurance_eligibility"].parse(args)
+    except ArgumentError as e:
+        audit_logger.log_error(f"Validation failed: {e}", request_id)
+        return {"error": str(e)}
     
     audit_logger.log_function_call("check_insurance_eligibility", args, request_id, config.DRY_RUN_MODE)
     
@@ -62,16 +78,27 @@ def check_insurance_func(patient_id: str) -> dict:
         audit_logger.log_error(str(e), request_id)
         return {"error": str(e)}
 
-def find_slots_func(specialty: str, start_date: str, end_date: str, provider:  Optional[str] = None) -> dict:
-    """Find available appointment slots"""
+def find_slots_func(
+    specialty: str,
+    start_date: str,
+    end_date: str,
+    provider:  Optional[str] = None,
+    page_size: int = 5,
+    cursor: Optional[str] = None
+) -> dict:
+    """Find available appointment slots, one page at a time (pass next_cursor to continue)"""
     request_id = str(uuid.uuid4())[:8]
     
-    args = {"specialty": specialty, "start_date":  start_date, "end_date": end_date, "provider":  provider}
+    args = {
+        "specialty": specialty, "start_date":  start_date, "end_date": end_date, "provider":  provider,
+        "page_size": page_size, "cursor": cursor
+    }
     
-    is_valid, message = input_validator.validate_find_slots(args)
-    if not is_valid: 
-        audit_logger. log_error(f"Validation failed: {message}", request_id)
-        return {"error": message}
+    try:
+        parsed = tool_schemas["find_available_slots"].parse(args)
+    except ArgumentError as e:
+        audit_logger.log_error(f"Validation failed: {e}", request_id)
+        return {"error": str(e)}
     
     audit_logger.log_function_call("find_available_slots", args, request_id, config.DRY_RUN_MODE)
     
@@ -79,34 +106,96 @@ def find_slots_func(specialty: str, start_date: str, end_date: str, provider:  O
         return {"dry_run": True, "message": "Would find available slots", "args": args}
     
     try:
-        result = healthcare_api.find_available_slots(specialty, start_date, end_date, provider)
-        result_dict = {"slots": [slot.model_dump() for slot in result]}
+        page = healthcare_api.find_available_slots_page(
+            specialty, parsed["start_date"], parsed["end_date"], provider, page_size, cursor
+        )
+        result_dict = {"slots": [slot.model_dump() for slot in page.slots], "next_cursor": page.next_cursor}
         audit_logger. log_function_result("find_available_slots", result_dict, request_id)
         return result_dict
     except Exception as e:
         audit_logger.log_error(str(e), request_id)
         return {"error": str(e)}
 
-def book_appointment_func(patient_id: str, slot_id: str, reason: str = "Follow-up consultation") -> dict:
-    """Book an appointment for a patient"""
+def book_appointment_func(
+    patient_id: str,
+    slot_id: str,
+    reason: str = "Follow-up consultation",
+    idempotency_key: Optional[str] = None
+) -> dict:
+    """Book an appointment for a patient.
+    
+    Calls repeating an idempotency_key get the original booking back
+    instead of creating a second appointment. The store coalesces live
+    duplicates; the backend keeps the key with the booking, so a retry after
+    the stored result expired or the process restarted still finds it.
+    """
     request_id = str(uuid.uuid4())[:8]
     
     args = {"patient_id": patient_id, "slot_id": slot_id, "reason": reason}
     
-    is_valid, message = input_validator.validate_book_appointment(args)
-    if not is_valid: 
-        audit_logger.log_error(f"Validation failed:  {message}", request_id)
-        return {"error": message}
+    try:
+        tool_schemas["book_appointment"].parse({**args, "idempotency_key": idempotency_key})
+    except ArgumentError as e:
+        audit_logger.log_error(f"Validation failed: {e}", request_id)
+        return {"error": str(e)}
     
     audit_logger.log_function_call("book_appointment", args, request_id, config.DRY_RUN_MODE)
     
     if config.DRY_RUN_MODE:
         return {"dry_run": True, "message": "Would book appointment", "args": args}
     
-    try: 
-        result = healthcare_api.book_appointment(patient_id, slot_id, reason)
-        result_dict = result.model_dump()
-        audit_logger.log_function_result("book_appointment", result_dict, request_id)
+    def _book() -> dict:
+        try: 
+            result = healthcare_api.book_appointment(patient_id, slot_id, reason, idempotency_key)
+            result_dict = result.model_dump()
+            audit_logger.log_function_result("book_appointment", result_dict, request_id)
+            return result_dict
+        except Exception as e:
+            audit_logger.log_error(str(e), request_id)
+            return {"error": str(e)}
+    
+    if not idempotency_key:
+        return _book()
+    
+    try:
+        result_dict, replayed = idempotency_store.run(
+            f"book_appointment:{idempotency_key}", _book,
+            should_store=lambda result: "error" not in result,
+            fingerprint=request_fingerprint(args)
+        )
+    except IdempotencyKeyConflict as e:
+        audit_logger.log_error(str(e), request_id)
+        return {"error": str(e)}
+    if replayed:
+        audit_logger.log_function_result("book_appointment", {"idempotent_replay": idempotency_key}, request_id)
+        return {**result_dict, "idempotent_replay": True}
+    return result_dict
+
+def schedule_visits_func(patient_id: str, visits: List[dict], start_date: str, end_date: str) -> dict:
+    """Find the earliest feasible itinerary for several visits (no booking)"""
+    request_id = str(uuid.uuid4())[:8]
+    
+    args = {"patient_id": patient_id, "visits": visits, "start_date": start_date, "end_date": end_date}
+    
+    try:
+        parsed = tool_schemas["schedule_visits"].parse(args)
+    except ArgumentError as e:
+        audit_logger.log_error(f"Validation failed: {e}", request_id)
+        return {"error": str(e)}
+    
+    audit_logger.log_function_call("schedule_visits", args, request_id, config.DRY_RUN_MODE)
+    
+    if config.DRY_RUN_MODE:
+        return {"dry_run": True, "message": "Would search for a combined itinerary", "args": args}
+    
+    try:
+        itinerary = scheduler.find_itinerary(patient_id, parsed["visits"], parsed["start_date"], parsed["end_date"])
+        
+        if itinerary is None:
+            return {"error": "No feasible itinerary in the requested date range"}
+        
+        result_dict = itinerary.model_dump()
+        audit_logger.log_function_result("schedule_visits", result_dict, request_id)
         return result_dict
     except Exception as e:
         audit_logger.log_error(str(e), request_id)
@@ -117,5 +206,18 @@ healthcare_tools = [
     search_patient_func,
     check_insurance_func,
     find_slots_func,
-    book_appointment_func
-]
\ No newline at end of file
+    book_appointment_func,
+    schedule_visits_func
+]
+
+# Tool name (as the LLM calls it) -> function
+tool_functions = {
+    "search_patient": search_patient_func,
+    "check_insurance_eligibility": check_insurance_func,
+    "find_available_slots": find_slots_func,
+    "book_appointment": book_appointment_func,
+    "schedule_visits": schedule_visits_func
+}
+
+# Compiled once from the signatures above; every call parses its arguments exactly once
+tool_schemas = compile_tool_schemas(tool_functions)
\ No newline at end of file
@@ -0,0 +1,245 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+from utils.config import config
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one process per directory is on the operator
+    fcntl = None
+
+
+class BookingJournal:
+    """Append-only write-ahead log of booking mutations with group commit.
+
+    Records are appended to <directory>/journal.log as JSON lines. A
+    background flusher makes them durable with one fsync per batch: it waits
+    up to ``group_commit_seconds`` (or until ``max_batch`` records are
+    pending) so concurrent bookings share a disk sync. With
+    ``group_commit_seconds=0`` every record is fsynced inline. Once
+    ``snapshot_every`` records have accumulated the owner writes a snapshot
+    and the log starts over, so recovery only replays the tail.
+    """
+
+    LOG_NAME = "journal.log"
+    SNAPSHOT_NAME = "snapshot.json"
+
+    def __init__(
+        self,
+        directory: str,
+        group_commit_seconds: float = 0.005,
+        max_batch: int = 64,
+        snapshot_every: int = 1000
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.group_commit_seconds = group_commit_seconds
+        self.max_batch = max_batch
+        self.snapshot_every = snapshot_every
+        self.sync_count = 0
+
+        self._lock_file = self._acquire_directory_lock()
+        self._log_path = self.directory / self.LOG_NAME
+        self._snapshot_path = self.directory / self.SNAPSHOT_NAME
+
+        self._cond = threading.Condition()
+        self._sync_lock = threading.Lock()  # Held around fsync so the log is never rotated mid-sync
+        self._closed = False
+        self._error: Optional[OSError] = None  # First write/fsync failure; the journal is unusable after it
+        self._recovered = self._load()
+        self._file = open(self._log_path, "a")
+
+        self._flusher = None
+        if group_commit_seconds > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+            self._flusher.start()
+
+    @classmethod
+    def from_config(cls, directory: str) -> "BookingJournal":
+        return cls(
+            directory,
+            group_commit_seconds=config.JOURNAL_GROUP_COMMIT_MS / 1000,
+            max_batch=config.JOURNAL_GROUP_COMMIT_MAX_BATCH,
+            snapshot_every=config.JOURNAL_SNAPSHOT_EVERY
+        )
+
+    def _acquire_directory_lock(self):
+        lock_file = open(self.directory / "LOCK", "w")
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise RuntimeError(f"Booking journal {self.directory} is already open in another process")
+        return lock_file
+
+    def _load(self) -> Tuple[Optional[dict], List[dict]]:
+        """Read the snapshot and the records after it; cut off a torn final write"""
+        snapshot, snapshot_seq = None, 0
+        if self._snapshot_path.exists():
+            with open(self._snapshot_path) as f:
+                data = json.load(f)
+            snapshot, snapshot_seq = data["state"], data["seq"]
+
+        records, good_bytes = [], 0
+        if self._log_path.exists():
+            with open(self._log_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # Crash mid-append; nothing after this was acknowledged
+                    good_bytes += len(line)
+                    if record["seq"] > snapshot_seq:
+                        records.append(record)
+            if self._log_path.stat().st_size > good_bytes:
+                os.truncate(self._log_path, good_bytes)
+
+        self._seq = records[-1]["seq"] if records else snapshot_seq
+        self._synced_seq = self._seq
+        self._records_since_snapshot = len(records)
+        return snapshot, records
+
+    def recover(self) -> Tuple[Optional[dict], List[dict]]:
+        """Last snapshot state (or None) and the journal records written after it"""
+        recovered, self._recovered = self._recovered, (None, [])
+        return recovered
+
+    def append(self, record: dict) -> int:
+        """Write one record to the log; returns its sequence number for wait_durable()"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Booking journal is closed")
+            if self._error:
+                raise self._error
+            self._seq += 1
+            try:
+                self._file.write(json.dumps({"seq": self._seq, **record}, separators=(",", ":")) + "\n")
+                self._records_since_snapshot += 1
+                if self._flusher is None:
+                    self._sync_locked()
+            except OSError as e:
+                self._fail_locked(e)
+                raise
+            self._cond.notify_all()
+            return self._seq
+
+    def wait_durable(self, seq: int):
+        """Block until record seq has been fsynced"""
+        with self._cond:
+            while self._synced_seq < seq:
+                if self._error:
+                    raise self._error
+                self._cond.wait()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced_seq = self._seq
+        self.sync_count += 1
+        self._cond.notify_all()
+
+    def _fail_locked(self, error: OSError):
+        """Record a disk failure and wake every waiter so it can raise it"""
+        if self._error is None:
+            self._error = error
+        self._cond.notify_all()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._synced_seq == self._seq and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                # Give concurrent bookings a moment to join this batch
+                deadline = time.monotonic() + self.group_commit_seconds
+                while self._seq - self._synced_seq < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            with self._sync_lock:
+                try:
+                    with self._cond:
+                        if self._synced_seq == self._seq:
+                            continue  # A snapshot synced this batch already
+                        target = self._seq
+                        self._file.flush()
+
+                    # Appends keep going into the buffer while the disk syncs
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    with self._cond:
+                        self._fail_locked(e)
+                    return
+
+                with self._cond:
+                    self._synced_seq = max(self._synced_seq, target)
+                    self.sync_count += 1
+                    self._cond.notify_all()
+
+    def should_snapshot(self) -> bool:
+        return self._records_since_snapshot >= self.snapshot_every
+
+    def write_snapshot(self, state: dict):
+        """Persist state as of the last appended record and start an empty log.
+
+        The caller must keep new records from being appended until this returns,
+        so that state covers exactly the records in the log.
+        """
+        with self._sync_lock, self._cond:
+            if self._error:
+                raise self._error
+            try:
+                self._sync_locked()
+
+                tmp_path = self._snapshot_path.with_suffix(".tmp")
+                with open(tmp_path, "w") as f:
+                    json.dump({"seq": self._seq, "taken_at": datetime.now().isoformat(), "state": state}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._snapshot_path)
+                self._fsync_directory()
+
+                # Records up to seq now live in the snapshot; a crash before this
+                # truncation is harmless because recovery skips them by seq
+                self._file.close()
+                self._file = open(self._log_path, "w")
+                self._records_since_snapshot = 0
+            except OSError as e:
+                self._fail_locked(e)
+                raise
+
+    def _fsync_directory(self):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher:
+            self._flusher.join()
+        with self._sync_lock, self._cond:
+            try:
+                if self._error is None:
+                    self._sync_locked()
+            finally:
+                self._file.close()
+                self._lock_file.close()
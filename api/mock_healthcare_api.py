@@ -1,47 +1,179 @@
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Iterator, Dict, Tuple, Union
+from collections import OrderedDict
+from itertools import islice
 from api.schemas import (
     Patient, InsuranceEligibility, InsuranceStatus, 
-    TimeSlot, Appointment, AppointmentStatus
+    TimeSlot, Appointment, AppointmentStatus, PatientMatch, SlotPage
 )
+from api.name_index import PatientNameIndex
+from api.journal import BookingJournal
+from utils.config import config
+import base64
+import json
+import multiprocessing
 import random
+import threading
+import time
+
+SLOT_HOURS = [9, 11, 14, 16]
+
+def encode_slot_cursor(state: dict) -> str:
+    """Opaque continuation token for a paged slot search"""
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def decode_slot_cursor(cursor: str) -> dict:
+    """Decode and type-check a cursor; the caller still bounds its day to the query"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(state, dict) or not {"d", "h", "n"} <= state.keys():
+            raise ValueError
+        if not isinstance(state["d"], str) or not _is_int(state["h"]) or not _is_int(state["n"]):
+            raise ValueError
+        if not 0 <= state["h"] <= len(SLOT_HOURS) or state["n"] < 1:
+            raise ValueError
+        state["day"] = datetime.strptime(state["d"], '%Y-%m-%d')
+        return state
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError("Invalid slot cursor")
+
+def _as_datetime(value: Union[str, date]) -> datetime:
+    """Midnight of a YYYY-MM-DD string or of an already parsed date"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def patient_id_order(patient: Patient) -> tuple:
+    """Sort key putting P002 before P010 before P0100"""
+    return len(patient.id), patient.id
+
+def default_patients() -> Dict[str, Patient]:
+    """Demo patient registry"""
+    return {
+        "P001": Patient(
+            id="P001",
+            name="Ravi Kumar",
+            date_of_birth="1985-03-15",
+            gender="male",
+            phone="+91-9876543210",
+            email="ravi. kumar@email.com",
+            insurance_id="INS-RK-2024"
+        ),
+        "P002": Patient(
+            id="P002",
+            name="Priya Sharma",
+            date_of_birth="1990-07-22",
+            gender="female",
+            phone="+91-9876543211",
+            email="priya.sharma@email.com",
+            insurance_id="INS-PS-2024"
+        ),
+        "P003": Patient(
+            id="P003",
+            name="Amit Singh",
+            date_of_birth="1978-11-05",
+            gender="male",
+            phone="+91-9876543212",
+            email="amit.singh@email.com",
+            insurance_id="INS-AS-2024"
+        )
+    }
 
 class MockHealthcareAPI:
     """Simulated healthcare backend for demo purposes"""
     
-    def __init__(self):
-        self.patients = {
-            "P001": Patient(
-                id="P001",
-                name="Ravi Kumar",
-                date_of_birth="1985-03-15",
-                gender="male",
-                phone="+91-9876543210",
-                email="ravi. kumar@email.com",
-                insurance_id="INS-RK-2024"
-            ),
-            "P002": Patient(
-                id="P002",
-                name="Priya Sharma",
-                date_of_birth="1990-07-22",
-                gender="female",
-                phone="+91-9876543211",
-                email="priya.sharma@email.com",
-                insurance_id="INS-PS-2024"
-            ),
-            "P003": Patient(
-                id="P003",
-                name="Amit Singh",
-                date_of_birth="1978-11-05",
-                gender="male",
-                phone="+91-9876543212",
-                email="amit.singh@email.com",
-                insurance_id="INS-AS-2024"
-            )
-        }
+    def __init__(
+        self,
+        patients: Optional[Dict[str, Patient]] = None,
+        appointment_prefix: str = "APT",
+        journal: Optional[BookingJournal] = None
+    ):
+        self.patients = default_patients() if patients is None else dict(patients)
+        
+        self.name_index = PatientNameIndex()
+        for patient in self.patients.values():
+            self.name_index.add(patient.id, patient.name)
         
         self.appointments = {}
         self.appointment_counter = 1000
+        self.appointment_prefix = appointment_prefix
+        
+        self.journal = journal
+        self._unapplied: Dict[str, Tuple[Appointment, int]] = {}  # Journaled, waiting for fsync
+        # Idempotency key -> (appointment_id, booked_at), oldest first; bounded by
+        # BOOKING_IDEMPOTENCY_TTL_SECONDS and BOOKING_IDEMPOTENCY_MAX_KEYS
+        self._idempotency_keys: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._booking_lock = threading.Lock()
+        if journal:
+            self._recover(journal)
+    
+    def _recover(self, journal: BookingJournal):
+        """Rebuild bookings from the last snapshot plus the journal tail"""
+        snapshot, records = journal.recover()
+        if snapshot:
+            self.appointment_counter = max(self.appointment_counter, snapshot["appointment_counter"])
+            self.appointments.update(
+                (appointment_id, Appointment(**data))
+                for appointment_id, data in snapshot["appointments"].items()
+            )
+            self._idempotency_keys.update(
+                (key, tuple(entry)) for key, entry in snapshot.get("idempotency_keys", {}).items()
+            )
+        for record in records:
+            if record["op"] == "book":
+                appointment = Appointment(**record["appointment"])
+                self.appointments[appointment.appointment_id] = appointment
+                self.appointment_counter = max(self.appointment_counter, record["counter"])
+                if record.get("idempotency_key"):
+                    self._idempotency_keys[record["idempotency_key"]] = (
+                        appointment.appointment_id, record.get("booked_at", time.time())
+                    )
+        self._prune_idempotency_keys()
+    
+    def _prune_idempotency_keys(self):
+        """Drop keys past their TTL or beyond the size bound, oldest first"""
+        expired_before = time.time() - config.BOOKING_IDEMPOTENCY_TTL_SECONDS
+        while self._idempotency_keys:
+            _, booked_at = next(iter(self._idempotency_keys.values()))
+            if booked_at > expired_before and len(self._idempotency_keys) <= config.BOOKING_IDEMPOTENCY_MAX_KEYS:
+                break
+            self._idempotency_keys.popitem(last=False)
+    
+    def _journal_state(self) -> dict:
+        self._prune_idempotency_keys()
+        appointments = {**self.appointments, **{aid: pending[0] for aid, pending in self._unapplied.items()}}
+        return {
+            "appointment_counter": self.appointment_counter,
+            "appointments": {
+                appointment_id: appointment.model_dump(mode="json")
+                for appointment_id, appointment in appointments.items()
+            },
+            "idempotency_keys": {key: list(entry) for key, entry in self._idempotency_keys.items()}
+        }
+    
+    def offset_appointment_counter(self, offset: int):
+        """Shift appointment numbering so independent replicas never reuse IDs"""
+        # A floor rather than an increment, so a counter recovered from the
+        # journal is not shifted a second time on restart
+        with self._booking_lock:
+            self.appointment_counter = max(self.appointment_counter, 1000 + offset)
+    
+    def open_journal(self, directory: str):
+        """Start journaling bookings to directory, first recovering what it already holds"""
+        with self._booking_lock:
+            if self.journal:
+                raise RuntimeError("Booking journal is already open")
+            self.journal = BookingJournal.from_config(directory)
+            self._recover(self.journal)
+    
+    def close(self):
+        if self.journal:
+            self.journal.close()
     
     def search_patient(self, name: str = None, patient_id: str = None) -> Optional[Patient]:
         """Search for patient by name or ID"""
@@ -49,12 +181,21 @@ class MockHealthcareAPI:
             return self.patients.get(patient_id)
         
         if name:
-            for patient in self.patients.values():
-                if name.lower() in patient.name.lower():
-                    return patient
+            # Several names can contain a partial one; the lowest patient_id wins,
+            # which is also what the sharded router picks
+            name_lower = name.lower()
+            matches = [patient for patient in self.patients.values() if name_lower in patient.name.lower()]
+            return min(matches, key=patient_id_order, default=None)
         
         return None
     
+    def search_patients_fuzzy(self, name: str, limit: int = 5, min_score: float = 0.5) -> List[PatientMatch]:
+        """Rank patients whose names look or sound like name (typos, transliterations)"""
+        return [
+            PatientMatch(patient=self.patients[pid], score=score)
+            for pid, score in self.name_index.search(name, limit, min_score)
+        ]
+    
     def check_insurance_eligibility(self, patient_id: str) -> InsuranceEligibility:
         """Check insurance eligibility for patient"""
         patient = self.patients.get(patient_id)
@@ -83,14 +224,65 @@ class MockHealthcareAPI:
     def find_available_slots(
         self, 
         specialty: str, 
-        start_date: str, 
-        end_date:  str,
+        start_date: Union[str, date],
+        end_date: Union[str, date],
         provider: Optional[str] = None
     ) -> List[TimeSlot]: 
         """Find available appointment slots"""
-        slots = []
-        start = datetime.strptime(start_date, '%Y-%m-%d')
-        end = datetime.strptime(end_date, '%Y-%m-%d')
+        return list(islice(self.iter_available_slots(specialty, start_date, end_date, provider), 5))
+    
+    def iter_available_slots(
+        self,
+        specialty: str,
+        start_date: Union[str, date],
+        end_date: Union[str, date],
+        provider: Optional[str] = None
+    ) -> Iterator[TimeSlot]:
+        """Yield every available slot in the date range, earliest first"""
+        for slot, _ in self._generate_slots(specialty, start_date, end_date, provider):
+            yield slot
+    
+    def find_available_slots_page(
+        self,
+        specialty: str,
+        start_date: Union[str, date],
+        end_date: Union[str, date],
+        provider: Optional[str] = None,
+        page_size: int = 5,
+        cursor: Optional[str] = None
+    ) -> SlotPage:
+        """One page of slots; pass next_cursor back to continue where this page stopped"""
+        query = {"s": specialty, "a": str(start_date), "b": str(end_date), "p": provider}
+        position = None
+        if cursor:
+            position = decode_slot_cursor(cursor)
+            if {key: position.get(key) for key in query} != query:
+                raise ValueError("Cursor does not belong to this slot search")
+            if not _as_datetime(start_date) <= position["day"] <= _as_datetime(end_date):
+                raise ValueError("Invalid slot cursor")
+        
+        generator = self._generate_slots(specialty, start_date, end_date, provider, position)
+        page = list(islice(generator, page_size + 1))
+        
+        next_cursor = None
+        if len(page) > page_size:
+            # One slot of look-ahead tells us whether another page exists
+            page = page[:page_size]
+            next_cursor = encode_slot_cursor({**query, **page[-1][1]})
+        
+        return SlotPage(slots=[slot for slot, _ in page], next_cursor=next_cursor)
+    
+    def _generate_slots(
+        self,
+        specialty: str,
+        start_date: Union[str, date],
+        end_date: Union[str, date],
+        provider: Optional[str] = None,
+        position: Optional[dict] = None
+    ) -> Iterator[tuple]:
+        """Lazily yield (slot, position_after_slot), optionally resuming from a position"""
+        start = _as_datetime(start_date)
+        end = _as_datetime(end_date)
         
         providers = {
             "cardiology": ["Dr.  Mehta", "Dr. Patel"],
@@ -105,49 +297,102 @@ class MockHealthcareAPI:
             available_providers = [provider] if provider in available_providers else available_providers
         
         current = start
+        hour_index = 0
         slot_id = 1
         
-        while current <= end and len(slots) < 5:
+        if position:
+            current = position["day"]
+            hour_index = position["h"]
+            slot_id = position["n"]
+        
+        while current <= end:
             if current. weekday() < 5:  # Weekdays only
-                for hour in [9, 11, 14, 16]: 
-                    start_time = current.replace(hour=hour, minute=0, second=0)
+                day = current.strftime('%Y-%m-%d')
+                for index in range(hour_index, len(SLOT_HOURS)):
+                    start_time = current.replace(hour=SLOT_HOURS[index], minute=0, second=0)
                     end_time = start_time + timedelta(hours=1)
                     
-                    slots.append(TimeSlot(
+                    slot = TimeSlot(
                         slot_id=f"SLOT-{slot_id: 04d}",
                         provider=random.choice(available_providers),
                         specialty=specialty,
                         start_time=start_time,
                         end_time=end_time,
                         location=f"{specialty.title()} Department, Main Hospital"
-                    ))
+                    )
                     slot_id += 1
+                    yield slot, {"d": day, "h": index + 1, "n": slot_id}
             
+            hour_index = 0
             current += timedelta(days=1)
-        
-        return slots[: 5] 
     
     def book_appointment(
         self,
         patient_id: str,
         slot_id: str,
-        reason: str = "Follow-up consultation"
+        reason: str = "Follow-up consultation",
+        idempotency_key: Optional[str] = None
     ) -> Appointment:
-        """Book an appointment for a patient"""
+        """Book an appointment for a patient.
+        
+        A repeated idempotency_key returns the appointment it already booked.
+        The key is journaled with the booking, so this holds across restarts.
+        """
         patient = self.patients.get(patient_id)
         
         if not patient:
             raise ValueError(f"Patient {patient_id} not found")
         
         
-        appointment_id = f"APT-{self.appointment_counter:06d}"
+        with self._booking_lock:
+            self._prune_idempotency_keys()
+            existing_id, _ = self._idempotency_keys.get(idempotency_key, (None, None))
+            if existing_id in self.appointments:
+                return self.appointments[existing_id]
+            if existing_id in self._unapplied:
+                appointment, seq = self._unapplied[existing_id]
+            else:
+                appointment, seq = self._book_locked(patient, slot_id, reason, idempotency_key)
+                if seq is None:
+                    return appointment
+        
+        # Write-ahead: the booking becomes visible only once it is on disk
+        try:
+            self.journal.wait_durable(seq)
+        except OSError:
+            with self._booking_lock:
+                # Never confirmed, so a retry with the same key must not find it
+                if self._unapplied.pop(appointment.appointment_id, None) and idempotency_key:
+                    self._idempotency_keys.pop(idempotency_key, None)
+            raise
+        
+        with self._booking_lock:
+            if appointment.appointment_id in self._unapplied:
+                self.appointments[appointment.appointment_id] = self._unapplied.pop(appointment.appointment_id)[0]
+                if self.journal.should_snapshot():
+                    try:
+                        self.journal.write_snapshot(self._journal_state())
+                    except OSError as e:
+                        # This booking is durable already; later ones will see the journal error
+                        print(f"⚠️ Booking journal snapshot failed: {e}")
+        return appointment
+    
+    def _book_locked(
+        self,
+        patient: Patient,
+        slot_id: str,
+        reason: str,
+        idempotency_key: Optional[str]
+    ) -> Tuple[Appointment, Optional[int]]:
+        """Create an appointment; returns it with its journal seq (None when not journaling)"""
+        appointment_id = f"{self.appointment_prefix}-{self.appointment_counter:06d}"
         self.appointment_counter += 1
         
         start_time = datetime.now() + timedelta(days=7)
         
         appointment = Appointment(
             appointment_id=appointment_id,
-            patient_id=patient_id,
+            patient_id=patient.id,
             patient_name=patient. name,
             provider="Dr. Mehta",
             specialty="Cardiology",
@@ -159,7 +404,43 @@ class MockHealthcareAPI:
             notes=f"Slot ID: {slot_id}"
         )
         
-        self.appointments[appointment_id] = appointment
-        return appointment
+        booked_at = time.time()
+        seq = None
+        if self.journal:
+            seq = self.journal.append({
+                "op": "book",
+                "counter": self.appointment_counter,
+                "appointment": appointment.model_dump(mode="json"),
+                "idempotency_key": idempotency_key,
+                "booked_at": booked_at
+            })
+            self._unapplied[appointment_id] = (appointment, seq)
+        else:
+            self.appointments[appointment_id] = appointment
+        
+        if idempotency_key:
+            self._idempotency_keys[idempotency_key] = (appointment_id, booked_at)
+            self._prune_idempotency_keys()
+        return appointment, seq
+
+def create_healthcare_api():
+    """Single in-memory backend, or a sharded router when HEALTHCARE_SHARDS > 1"""
+    # Spawned children (pool workers, shard servers) re-import this module,
+    # sometimes via the parent's __main__. current_process().name is set
+    # before they import anything; parent_process() only after
+    in_main_process = multiprocessing.current_process().name == "MainProcess"
+    # Only the top-level process journals to JOURNAL_DIR; children open a
+    # directory of their own with open_journal()
+    journal_dir = config.JOURNAL_DIR if in_main_process else None
+    if config.HEALTHCARE_SHARDS > 1:
+        from api.sharded_api import ShardedHealthcareAPI
+        return ShardedHealthcareAPI.from_patients(
+            default_patients(),
+            config.HEALTHCARE_SHARDS,
+            # A child still bootstrapping cannot start processes of its own
+            use_processes=config.HEALTHCARE_SHARD_PROCESSES and in_main_process,
+            journal_dir=journal_dir
+        )
+    return MockHealthcareAPI(journal=BookingJournal.from_config(journal_dir) if journal_dir else None)
 
-healthcare_api = MockHealthcareAPI()
\ No newline at end of file
+healthcare_api = create_healthcare_api()
\ No newline at end of file
@@ -0,0 +1,160 @@
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import islice
+from typing import Dict, List, Set, Tuple
+import re
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+# Transliteration variants that should sound alike (Kumaar/Kumar, Sarma/Sharma, Deepa/Dipa)
+_PHONETIC_RULES = [
+    (re.compile(r"(.)\1+"), r"\1"),
+    (re.compile(r"ee|ie"), "i"),
+    (re.compile(r"oo|ou"), "u"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"([bdgkst])h"), r"\1"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"ck|q|c(?=[aou])"), "k"),
+    (re.compile(r"(?<=.)[aeiouy]"), ""),
+]
+
+
+def soundex(token: str) -> str:
+    """Classic four-character Soundex code"""
+    token = re.sub(r"[^a-z]", "", token.lower())
+    if not token:
+        return ""
+    code = token[0].upper()
+    previous = _SOUNDEX_CODES.get(token[0], "")
+    for char in token[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+        if char not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def phonetic_key(token: str) -> str:
+    """Metaphone-style skeleton: folded digraphs and doubled letters, no inner vowels"""
+    key = re.sub(r"[^a-z]", "", token.lower())
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return key
+
+
+def _tokens(name: str) -> List[str]:
+    return re.findall(r"[a-z]+", name.lower())
+
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f"  {' '.join(_tokens(name))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PatientNameIndex:
+    """Precomputed phonetic and trigram keys for bounded-time fuzzy name search.
+
+    Candidates come from inverted indexes, never a registry scan: first names
+    sharing a phonetic key with every query token (an intersection, so its
+    cost is bounded by the rarest token), then names matching the most
+    selective single key, then names sharing the rarest few trigrams.
+    Postings holding more than ``max_posting_size`` names are only ever
+    intersected, never walked, and at most ``max_candidates`` are scored.
+    """
+
+    def __init__(self, max_candidates: int = 100, max_posting_size: int = 2000, max_trigram_postings: int = 6):
+        self.max_candidates = max_candidates
+        self.max_posting_size = max_posting_size
+        self.max_trigram_postings = max_trigram_postings
+        self._names: Dict[str, str] = {}
+        self._phonetic_postings: Dict[str, Set[str]] = defaultdict(set)
+        self._trigram_postings: Dict[str, Set[str]] = defaultdict(set)
+
+    def add(self, patient_id: str, name: str):
+        self._names[patient_id] = name
+        for key in self._phonetic_keys(name):
+            self._phonetic_postings[key].add(patient_id)
+        for trigram in _trigrams(name):
+            self._trigram_postings[trigram].add(patient_id)
+
+    @staticmethod
+    def _token_keys(token: str) -> Set[str]:
+        return {f"S:{soundex(token)}", f"M:{phonetic_key(token)}"}
+
+    @classmethod
+    def _phonetic_keys(cls, name: str) -> Set[str]:
+        return {key for token in _tokens(name) for key in cls._token_keys(token)}
+
+    def _candidates(self, query: str) -> Set[str]:
+        tokens = _tokens(query)
+        candidates: Set[str] = set()
+
+        # Names agreeing with every query token on a phonetic key. Intersecting
+        # smallest-first costs at most the smallest posting, however common the
+        # other tokens are
+        for key_of in (lambda token: f"M:{phonetic_key(token)}", lambda token: f"S:{soundex(token)}"):
+            postings = sorted((self._phonetic_postings.get(key_of(token), set()) for token in tokens), key=len)
+            if postings[0] and len(candidates) < self.max_candidates:
+                shared = set.intersection(*postings) if len(postings) > 1 else postings[0]
+                candidates.update(islice(shared, self.max_candidates - len(candidates)))
+        if len(candidates) >= self.max_candidates:
+            return candidates
+
+        # Then names matching only the most selective token key
+        token_postings = [
+            posting for posting in (self._phonetic_postings.get(key) for key in self._phonetic_keys(query))
+            if posting and len(posting) <= self.max_posting_size
+        ]
+        for posting in sorted(token_postings, key=len):
+            if len(candidates) >= self.max_candidates:
+                return candidates
+            candidates.update(islice(posting, self.max_candidates - len(candidates)))
+
+        # Misspellings that break the phonetic keys still share some rare trigrams
+        trigram_postings = sorted(
+            (posting for posting in (self._trigram_postings.get(t) for t in _trigrams(query))
+             if posting and len(posting) <= self.max_posting_size),
+            key=len
+        )[:self.max_trigram_postings]
+        trigram_hits = Counter()
+        for posting in trigram_postings:
+            trigram_hits.update(posting)
+        min_shared = max(1, len(trigram_postings) // 2)
+        for pid, hits in trigram_hits.most_common():
+            if hits < min_shared or len(candidates) >= self.max_candidates:
+                break
+            candidates.add(pid)
+        return candidates
+
+    def _score(self, query: str, name: str) -> float:
+        query_lower, name_lower = query.lower().strip(), name.lower()
+        if query_lower and query_lower in name_lower:
+            return 1.0
+
+        query_trigrams, name_trigrams = _trigrams(query), _trigrams(name)
+        dice = 2 * len(query_trigrams & name_trigrams) / (len(query_trigrams) + len(name_trigrams))
+
+        name_keys = {phonetic_key(token) for token in _tokens(name)}
+        query_tokens = _tokens(query)
+        phonetic = sum(1 for token in query_tokens if phonetic_key(token) in name_keys) / len(query_tokens)
+
+        spelling = SequenceMatcher(None, query_lower, name_lower).ratio()
+        return round(0.3 * dice + 0.35 * phonetic + 0.35 * spelling, 3)
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.5) -> List[Tuple[str, float]]:
+        """Ranked (patient_id, score) pairs for names resembling query"""
+        if not _tokens(query):
+            return []
+        scored = [(pid, self._score(query, self._names[pid])) for pid in self._candidates(query)]
+        scored = [(pid, score) for pid, score in scored if score >= min_score]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
@@ -32,6 +32,11 @@ class Patient(BaseModel):
         except ValueError: 
             raise ValueError("Date of birth must be in YYYY-MM-DD format")
 
+class PatientMatch(BaseModel):
+    """Fuzzy name search candidate"""
+    patient: Patient
+    score: float
+
 class InsuranceEligibility(BaseModel):
     """Insurance eligibility check result"""
     patient_id: str
@@ -51,6 +56,11 @@ class TimeSlot(BaseModel):
     end_time: datetime
     location: str
 
+class SlotPage(BaseModel):
+    """One page of a slot search plus the token for the next page"""
+    slots: List[TimeSlot]
+    next_cursor: Optional[str] = None
+
 class Appointment(BaseModel):
     """FHIR-compliant Appointment resource"""
     appointment_id: str
@@ -63,4 +73,19 @@ class Appointment(BaseModel):
     location: str
     status: AppointmentStatus
     reason: Optional[str] = None
-    notes: Optional[str] = None
\ No newline at end of file
+    notes: Optional[str] = None
+class VisitRequest(BaseModel):
+    """One visit in a combined multi-appointment booking"""
+    specialty: str
+    duration_minutes: int = 60
+    after: Optional[str] = None
+    same_day: bool = False
+    provider: Optional[str] = None
+
+class Itinerary(BaseModel):
+    """Earliest feasible combination of slots for a set of visits"""
+    patient_id: str
+    visits: List[TimeSlot]
+    same_day_satisfied: bool
+    starts_at: datetime
+    ends_at: datetime
@@ -0,0 +1,240 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from api.mock_healthcare_api import MockHealthcareAPI, patient_id_order
+from api.journal import BookingJournal
+from api.schemas import Patient, InsuranceEligibility, TimeSlot, Appointment, PatientMatch, SlotPage
+import multiprocessing
+import os
+import threading
+import zlib
+
+
+def shard_index(key: str, shard_count: int) -> int:
+    """Stable shard for a key (same answer in every process, unlike hash())"""
+    return zlib.crc32(key.lower().encode("utf-8")) % shard_count
+
+
+def _open_journal(journal_dir: Optional[str]) -> Optional[BookingJournal]:
+    return BookingJournal.from_config(journal_dir) if journal_dir else None
+
+
+def _serve_shard(conn, patients: Dict[str, dict], appointment_prefix: str, journal_dir: Optional[str]):
+    """Shard process main loop: run MockHealthcareAPI calls received over the pipe"""
+    api = MockHealthcareAPI(
+        patients={pid: Patient(**data) for pid, data in patients.items()},
+        appointment_prefix=appointment_prefix,
+        journal=_open_journal(journal_dir)
+    )
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        method, args, kwargs = message
+        try:
+            result = getattr(api, method)(*args, **kwargs)
+            if isinstance(result, Iterator):
+                result = list(result)
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", e))
+    api.close()
+    conn.close()
+
+
+@contextmanager
+def _single_backend_env():
+    # Spawned children re-import the API module; keep them from sharding again
+    previous = os.environ.get("HEALTHCARE_SHARDS")
+    os.environ["HEALTHCARE_SHARDS"] = "1"
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["HEALTHCARE_SHARDS"]
+        else:
+            os.environ["HEALTHCARE_SHARDS"] = previous
+
+
+class ProcessShard:
+    """MockHealthcareAPI running in its own process, called over a pipe"""
+
+    def __init__(self, patients: Dict[str, Patient], appointment_prefix: str, journal_dir: Optional[str] = None):
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_serve_shard,
+            args=(child_conn, {pid: p.model_dump() for pid, p in patients.items()}, appointment_prefix, journal_dir),
+            daemon=True
+        )
+        with _single_backend_env():
+            self._process.start()
+        child_conn.close()
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, *args, **kwargs):
+        with self._lock:
+            self._conn.send((method, args, kwargs))
+            status, result = self._conn.recv()
+        if status == "error":
+            raise result
+        return result
+
+    def search_patient(self, name: str = None, patient_id: str = None) -> Optional[Patient]:
+        return self._call("search_patient", name=name, patient_id=patient_id)
+
+    def search_patients_fuzzy(self, name: str, limit: int = 5, min_score: float = 0.5) -> List[PatientMatch]:
+        return self._call("search_patients_fuzzy", name, limit, min_score)
+
+    def check_insurance_eligibility(self, patient_id: str) -> InsuranceEligibility:
+        return self._call("check_insurance_eligibility", patient_id)
+
+    def find_available_slots(self, specialty, start_date, end_date, provider=None) -> List[TimeSlot]:
+        return self._call("find_available_slots", specialty, start_date, end_date, provider)
+
+    def iter_available_slots(self, specialty, start_date, end_date, provider=None) -> Iterator[TimeSlot]:
+        return iter(self._call("iter_available_slots", specialty, start_date, end_date, provider))
+
+    def find_available_slots_page(self, specialty, start_date, end_date, provider=None,
+                                  page_size=5, cursor=None) -> SlotPage:
+        return self._call("find_available_slots_page", specialty, start_date, end_date, provider, page_size, cursor)
+
+    def book_appointment(self, patient_id: str, slot_id: str, reason: str = "Follow-up consultation",
+                         idempotency_key: Optional[str] = None) -> Appointment:
+        return self._call("book_appointment", patient_id, slot_id, reason, idempotency_key)
+
+    def offset_appointment_counter(self, offset: int):
+        return self._call("offset_appointment_counter", offset)
+
+    def open_journal(self, directory: str):
+        return self._call("open_journal", directory)
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self._conn.close()
+        self._process.join(timeout=5)
+
+
+class ShardedHealthcareAPI:
+    """Routes MockHealthcareAPI calls across several backend shards.
+
+    Patients and bookings are placed by a hash of patient_id; provider and
+    slot calendars by a hash of the specialty. Name searches have no shard
+    key, so they are scattered to every shard and every hit is gathered; a
+    partial name resolves to the lowest matching patient_id, as it does on a
+    single backend.
+    Exposes the same methods as MockHealthcareAPI, so the tool layer is
+    unaware of sharding.
+    """
+
+    def __init__(self, shards: list):
+        if not shards:
+            raise ValueError("At least one shard is required")
+        self.shards = shards
+        self._scatter_pool = ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="shard-scatter")
+
+    @classmethod
+    def from_patients(
+        cls,
+        patients: Dict[str, Patient],
+        shard_count: int,
+        use_processes: bool = False,
+        journal_dir: Optional[str] = None
+    ) -> "ShardedHealthcareAPI":
+        """Partition a patient registry over shard_count in-process or process-backed shards.
+
+        With journal_dir each shard journals its bookings to journal_dir/shard-<i>.
+        """
+        partitions = [{} for _ in range(shard_count)]
+        for patient_id, patient in patients.items():
+            partitions[shard_index(patient_id, shard_count)][patient_id] = patient
+
+        shards = []
+        for i, partition in enumerate(partitions):
+            shard_journal_dir = os.path.join(journal_dir, f"shard-{i}") if journal_dir else None
+            if use_processes:
+                shards.append(ProcessShard(partition, f"APT{i}", shard_journal_dir))
+            else:
+                shards.append(MockHealthcareAPI(
+                    patients=partition,
+                    appointment_prefix=f"APT{i}",
+                    journal=_open_journal(shard_journal_dir)
+                ))
+        return cls(shards)
+
+    def shard_for_patient(self, patient_id: str):
+        return self.shards[shard_index(patient_id, len(self.shards))]
+
+    def shard_for_specialty(self, specialty: str):
+        return self.shards[shard_index(specialty, len(self.shards))]
+
+    def search_patient(self, name: str = None, patient_id: str = None) -> Optional[Patient]:
+        """Search for patient by name or ID"""
+        if patient_id:
+            return self.shard_for_patient(patient_id).search_patient(patient_id=patient_id)
+
+        if name:
+            futures = [self._scatter_pool.submit(shard.search_patient, name=name) for shard in self.shards]
+            hits = [patient for patient in (future.result() for future in futures) if patient]
+            return min(hits, key=patient_id_order, default=None)
+
+        return None
+
+    def search_patients_fuzzy(self, name: str, limit: int = 5, min_score: float = 0.5) -> List[PatientMatch]:
+        """Scatter the fuzzy search to every shard and merge the top matches"""
+        futures = [
+            self._scatter_pool.submit(shard.search_patients_fuzzy, name, limit, min_score)
+            for shard in self.shards
+        ]
+        matches = [match for future in futures for match in future.result()]
+        matches.sort(key=lambda match: (-match.score, match.patient.id))
+        return matches[:limit]
+
+    def check_insurance_eligibility(self, patient_id: str) -> InsuranceEligibility:
+        """Check insurance eligibility for patient"""
+        return self.shard_for_patient(patient_id).check_insurance_eligibility(patient_id)
+
+    def find_available_slots(self, specialty: str, start_date: str, end_date: str, provider: Optional[str] = None) -> List[TimeSlot]:
+        """Find available appointment slots"""
+        return self.shard_for_specialty(specialty).find_available_slots(specialty, start_date, end_date, provider)
+
+    def iter_available_slots(self, specialty: str, start_date: str, end_date: str, provider: Optional[str] = None) -> Iterator[TimeSlot]:
+        """Yield every available slot in the date range, earliest first"""
+        return self.shard_for_specialty(specialty).iter_available_slots(specialty, start_date, end_date, provider)
+
+    def find_available_slots_page(
+        self,
+        specialty: str,
+        start_date: str,
+        end_date: str,
+        provider: Optional[str] = None,
+        page_size: int = 5,
+        cursor: Optional[str] = None
+    ) -> SlotPage:
+        """One page of slots; pass next_cursor back to continue where this page stopped"""
+        return self.shard_for_specialty(specialty).find_available_slots_page(
+            specialty, start_date, end_date, provider, page_size, cursor
+        )
+
+    def book_appointment(self, patient_id: str, slot_id: str, reason: str = "Follow-up consultation",
+                         idempotency_key: Optional[str] = None) -> Appointment:
+        """Book an appointment for a patient"""
+        return self.shard_for_patient(patient_id).book_appointment(patient_id, slot_id, reason, idempotency_key)
+
+    def offset_appointment_counter(self, offset: int):
+        for shard in self.shards:
+            shard.offset_appointment_counter(offset)
+
+    def open_journal(self, directory: str):
+        """Journal each shard's bookings to directory/shard-<i>"""
+        for i, shard in enumerate(self.shards):
+            shard.open_journal(os.path.join(directory, f"shard-{i}"))
+
+    def close(self):
+        self._scatter_pool.shutdown(wait=False)
+        for shard in self.shards:
+            shard.close()
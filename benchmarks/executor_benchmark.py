@@ -0,0 +1,73 @@
+"""Throughput of the in-process agent vs. the process-pool executor.
+
+Runs the CPU-side request path (safety check, rule-based routing, pydantic
+validation, audit logging and summary generation) without calling the LLM,
+so it needs no API key:
+
+    python -m benchmarks.executor_benchmark --requests 4000
+"""
+from contextlib import redirect_stdout, redirect_stderr
+import argparse
+import os
+import time
+
+from agent.executor import ProcessPoolRequestExecutor
+
+SAMPLE_REQUESTS = [
+    "Schedule a cardiology follow-up for patient Ravi Kumar and check insurance eligibility",
+    "Check insurance for patient P002",
+    "Book an orthopedics appointment for Priya Sharma",
+    "Search for patient P003",
+]
+
+
+def build_workload(count: int) -> list:
+    return [SAMPLE_REQUESTS[i % len(SAMPLE_REQUESTS)] for i in range(count)]
+
+
+def run_serial(workload: list) -> float:
+    from agent.clinical_agent import create_agent
+
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        agent = create_agent(use_llm=False)
+        start = time.perf_counter()
+        for user_input in workload:
+            agent.process_request(user_input)
+        return time.perf_counter() - start
+
+
+def run_pool(workload: list, workers: int, chunksize: int) -> float:
+    with ProcessPoolRequestExecutor(max_workers=workers, use_llm=False, quiet=True) as executor:
+        # Spawn and initialise every worker before timing so pool spin-up is not measured
+        ready = executor.warm_up()
+        if ready != workers:
+            raise RuntimeError(f"Only {ready} of {workers} workers started")
+        executor.map(SAMPLE_REQUESTS * workers, chunksize=1)  # Warm per-worker caches
+        start = time.perf_counter()
+        executor.map(workload, chunksize=chunksize)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--chunksize", type=int, default=50)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    workload = build_workload(args.requests)
+
+    serial = run_serial(workload)
+    print(f"{'mode':<14}{'seconds':>10}{'req/s':>12}{'speedup':>10}")
+    print(f"{'in-process':<14}{serial:>10.2f}{len(workload) / serial:>12.0f}{1.0:>10.2f}")
+
+    worker_counts = sorted({2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers}
+                           | {args.max_workers})
+    for workers in worker_counts:
+        elapsed = run_pool(workload, workers, args.chunksize)
+        label = f"pool x{workers}"
+        print(f"{label:<14}{elapsed:>10.2f}{len(workload) / elapsed:>12.0f}{serial / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
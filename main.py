@@ -1,6 +1,7 @@
-from agent.clinical_agent import create_agent
+from agent.clinical_agent import create_agent, startup_timings
 from utils.config import config
 import json
+import uuid
 
 def print_separator():
     print("\n" + "="*80 + "\n")
@@ -32,6 +33,9 @@ def main():
     print("Initializing agent...")
     agent = create_agent()
     print("✓ Agent initialized successfully")
+    print("⏱️  Startup timings: " + ", ".join(
+        f"{name}={ms:.1f}ms" for name, ms in startup_timings.items()
+    ))
     print_separator()
     
     test_cases = [
@@ -63,6 +67,10 @@ def main():
     print("\nType 'exit' to quit")
     print_separator()
     
+    # One session for the whole interactive conversation so follow-ups
+    # ("now check his insurance") reuse the patient already found
+    session_id = str(uuid.uuid4())
+    
     while True:
         try:
             user_input = input("\n👤 You: ").strip()
@@ -75,7 +83,7 @@ def main():
                 continue
             
             print("\n🤖 Agent Processing...")
-            result = agent.process_request(user_input)
+            result = agent.process_request(user_input, session_id=session_id)
             format_result(result)
             
         except KeyboardInterrupt: 
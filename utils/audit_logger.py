@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
@@ -9,19 +10,40 @@ class AuditLogger:
     
     def __init__(self, log_dir: str = "logs"):
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
-        
-        log_file = self. log_dir / f"audit_{datetime.now().strftime('%Y%m%d')}.log"
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger("ClinicalAgent")
+        self._logger = None
+        self._level = logging.INFO
+        self._lock = threading.Lock()
+    
+    @property
+    def logger(self) -> logging.Logger:
+        """Create the log directory and handlers on first use, not at import"""
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    self.log_dir.mkdir(exist_ok=True)
+                    
+                    log_file = self.log_dir / f"audit_{datetime.now().strftime('%Y%m%d')}.log"
+                    
+                    logging.basicConfig(
+                        level=logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[
+                            logging.FileHandler(log_file),
+                            logging.StreamHandler()
+                        ]
+                    )
+                    logger = logging.getLogger("ClinicalAgent")
+                    logger.setLevel(self._level)
+                    self._logger = logger
+        return self._logger
+    
+    def set_level(self, level: str):
+        """Apply LOG_LEVEL now, or when the logger is first created"""
+        level_number = logging.getLevelName(level.upper())
+        with self._lock:
+            self._level = level_number if isinstance(level_number, int) else logging.INFO
+            if self._logger is not None:
+                self._logger.setLevel(self._level)
     
     def log_request(self, user_input: str, request_id: str):
         """Log incoming user request"""
@@ -44,6 +66,14 @@ class AuditLogger:
         """Log when agent refuses to act"""
         self.logger.warning(f"[REFUSAL:{request_id}] Reason: {reason}")
     
+    def log_circuit_transition(self, name: str, old_state: str, new_state: str, reason: str):
+        """Log circuit breaker state changes"""
+        self.logger.warning(f"[CIRCUIT:{name}] {old_state} -> {new_state} | Reason: {reason}")
+    
+    def log_config_reload(self, message: str):
+        """Log configuration hot reloads"""
+        self.logger.info(f"[CONFIG] Reloaded | {message}")
+    
     def log_error(self, error:  str, request_id: str):
         """Log errors"""
         self.logger.error(f"[ERROR:{request_id}] {error}")
@@ -0,0 +1,250 @@
+from collections import deque
+from contextlib import contextmanager
+from enum import Enum
+from typing import Callable, List, Optional
+from utils.audit_logger import audit_logger
+from utils.config import config
+import threading
+import time
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open or saturated"""
+
+
+class CircuitBreaker:
+    """Failure-rate and slow-call circuit breaker with half-open probing.
+
+    Outcomes of the last ``window_size`` calls are tracked; once at least
+    ``min_calls`` are recorded and either the failure rate or the slow-call
+    rate crosses its threshold the circuit opens. After ``open_seconds`` up to
+    ``half_open_max_calls`` probes are let through: if they all succeed
+    quickly the circuit closes, otherwise it opens again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 15.0,
+        slow_call_rate_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.CLOSED
+        self.transitions = deque(maxlen=50)
+        self._listeners: List[Callable[[str, CircuitState, CircuitState, str], None]] = []
+        self._window = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._unnotified: list = []  # Transitions made under the lock, announced after it
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[str, CircuitState, CircuitState, str], None]):
+        """Call listener(name, old_state, new_state, reason) on every transition"""
+        self._listeners.append(listener)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the lock for the block, then notify listeners of its transitions outside it"""
+        with self._lock:
+            try:
+                yield
+            finally:
+                pending, self._unnotified = self._unnotified, []
+        for old_state, new_state, reason in pending:
+            for listener in self._listeners:
+                listener(self.name, old_state, new_state, reason)
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected outright (does not reserve a probe)"""
+        with self._lock:
+            return (self.state == CircuitState.OPEN
+                    and time.monotonic() - self._opened_at < self.open_seconds)
+
+    def allow_request(self) -> bool:
+        """Reserve permission for one call; every True must be followed by a record_* call"""
+        with self._locked():
+            if self.state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self._transition(CircuitState.HALF_OPEN, "open period elapsed")
+
+            if self.state == CircuitState.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_max_calls:
+                    return False
+                self._probes_in_flight += 1
+
+            return True
+
+    def record_success(self, latency_seconds: float):
+        slow = latency_seconds >= self.slow_call_seconds
+        with self._locked():
+            if self.state == CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if slow:
+                    self._transition(CircuitState.OPEN, f"slow probe ({latency_seconds:.1f}s)")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_max_calls:
+                    self._transition(CircuitState.CLOSED, "probes succeeded")
+                return
+
+            self._window.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self, latency_seconds: float, error: Optional[BaseException] = None):
+        with self._locked():
+            if self.state == CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._transition(CircuitState.OPEN, f"probe failed: {error}")
+                return
+
+            self._window.append((True, latency_seconds >= self.slow_call_seconds))
+            self._evaluate()
+
+    def record_cancelled(self):
+        """Give back a reserved call that ended without an outcome (interrupted or cancelled)"""
+        with self._locked():
+            if self.state == CircuitState.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _evaluate(self):
+        if self.state != CircuitState.CLOSED or len(self._window) < self.min_calls:
+            return
+
+        failure_rate = sum(1 for failed, _ in self._window if failed) / len(self._window)
+        slow_rate = sum(1 for _, slow in self._window if slow) / len(self._window)
+
+        if failure_rate >= self.failure_rate_threshold:
+            self._transition(CircuitState.OPEN, f"failure rate {failure_rate:.0%}")
+        elif slow_rate >= self.slow_call_rate_threshold:
+            self._transition(CircuitState.OPEN, f"slow call rate {slow_rate:.0%}")
+
+    def _transition(self, new_state: CircuitState, reason: str):
+        old_state = self.state
+        self.state = new_state
+        if new_state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if new_state == CircuitState.CLOSED:
+            self._window.clear()
+        self.transitions.append({
+            "at": time.time(), "from": old_state.value, "to": new_state.value, "reason": reason
+        })
+        self._unnotified.append((old_state, new_state, reason))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = len(self._window)
+            return {
+                "name": self.name,
+                "state": self.state.value,
+                "window_calls": calls,
+                "failure_rate": sum(1 for failed, _ in self._window if failed) / calls if calls else 0.0,
+                "slow_call_rate": sum(1 for _, slow in self._window if slow) / calls if calls else 0.0,
+                "transitions": list(self.transitions)
+            }
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: +1/limit per fast success, x backoff_ratio on failure or slow call.
+
+    Callers beyond the current limit queue for up to the acquire timeout and
+    are shed after that.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        target_latency_seconds: float = 8.0,
+        backoff_ratio: float = 0.7
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency_seconds = target_latency_seconds
+        self.backoff_ratio = backoff_ratio
+
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.shed_count = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """Take a slot, waiting up to timeout seconds; False means the call was shed"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.shed_count += 1
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency_seconds: Optional[float] = None, success: bool = True):
+        """Return a slot; latency None releases without adjusting the limit"""
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if latency_seconds is not None:
+                if success and latency_seconds <= self.target_latency_seconds:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                else:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            return {
+                "name": self.name,
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "shed_count": self.shed_count
+            }
+
+
+llm_circuit_breaker = CircuitBreaker(
+    "llm_endpoint",
+    window_size=config.LLM_CIRCUIT_WINDOW,
+    min_calls=config.LLM_CIRCUIT_MIN_CALLS,
+    failure_rate_threshold=config.LLM_CIRCUIT_FAILURE_RATE,
+    slow_call_seconds=config.LLM_SLOW_CALL_SECONDS,
+    slow_call_rate_threshold=config.LLM_CIRCUIT_SLOW_CALL_RATE,
+    open_seconds=config.LLM_CIRCUIT_OPEN_SECONDS
+)
+
+llm_concurrency_limiter = AdaptiveConcurrencyLimiter(
+    "llm_endpoint",
+    initial_limit=config.LLM_INITIAL_CONCURRENCY,
+    max_limit=config.LLM_MAX_CONCURRENCY,
+    target_latency_seconds=config.LLM_TARGET_LATENCY_SECONDS
+)
+
+llm_circuit_breaker.add_listener(
+    lambda name, old_state, new_state, reason: audit_logger.log_circuit_transition(
+        name, old_state.value, new_state.value, reason
+    )
+)
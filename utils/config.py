@@ -1,4 +1,12 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from utils.audit_logger import audit_logger
+import json
 import os
+import string
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,12 +16,206 @@ class Config:
     DRY_RUN_MODE = os.getenv("DRY_RUN_MODE", "false").lower() == "true"
     LOG_LEVEL = os. getenv("LOG_LEVEL", "INFO")
     MAX_FUNCTION_CALLS = int(os.getenv("MAX_FUNCTION_CALLS", "5"))
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+    MAX_DATE_RANGE_DAYS = int(os.getenv("MAX_DATE_RANGE_DAYS", "90"))
+    MAX_RESULT_ROWS = int(os.getenv("MAX_RESULT_ROWS", "200"))
     HEALTHCARE_API_URL = os. getenv("HEALTHCARE_API_URL", "http://localhost:8000")
+    HEALTHCARE_SHARDS = int(os.getenv("HEALTHCARE_SHARDS", "1"))
+    HEALTHCARE_SHARD_PROCESSES = os.getenv("HEALTHCARE_SHARD_PROCESSES", "false").lower() == "true"
+    JOURNAL_DIR = os.getenv("JOURNAL_DIR")  # None keeps bookings in memory only
+    JOURNAL_GROUP_COMMIT_MS = float(os.getenv("JOURNAL_GROUP_COMMIT_MS", "5"))  # 0 fsyncs every booking
+    JOURNAL_GROUP_COMMIT_MAX_BATCH = int(os.getenv("JOURNAL_GROUP_COMMIT_MAX_BATCH", "64"))
+    JOURNAL_SNAPSHOT_EVERY = int(os.getenv("JOURNAL_SNAPSHOT_EVERY", "1000"))
+    FUZZY_MATCH_MIN_SCORE = float(os.getenv("FUZZY_MATCH_MIN_SCORE", "0.6"))
+    MAX_SLOT_PAGE_SIZE = int(os.getenv("MAX_SLOT_PAGE_SIZE", "50"))
+    FAST_STARTUP = os.getenv("FAST_STARTUP", "false").lower() == "true"
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+    SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "1800"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+    BOOKING_IDEMPOTENCY_TTL_SECONDS = float(os.getenv("BOOKING_IDEMPOTENCY_TTL_SECONDS", "86400"))
+    BOOKING_IDEMPOTENCY_MAX_KEYS = int(os.getenv("BOOKING_IDEMPOTENCY_MAX_KEYS", "100000"))
+    LLM_CIRCUIT_WINDOW = int(os.getenv("LLM_CIRCUIT_WINDOW", "20"))
+    LLM_CIRCUIT_MIN_CALLS = int(os.getenv("LLM_CIRCUIT_MIN_CALLS", "5"))
+    LLM_CIRCUIT_FAILURE_RATE = float(os.getenv("LLM_CIRCUIT_FAILURE_RATE", "0.5"))
+    LLM_CIRCUIT_SLOW_CALL_RATE = float(os.getenv("LLM_CIRCUIT_SLOW_CALL_RATE", "0.5"))
+    LLM_CIRCUIT_OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30"))
+    LLM_SLOW_CALL_SECONDS = float(os.getenv("LLM_SLOW_CALL_SECONDS", "15"))
+    LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_TARGET_LATENCY_SECONDS = float(os.getenv("LLM_TARGET_LATENCY_SECONDS", "8"))
+    LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "2"))
+    LLM_MODE = os.getenv("LLM_MODE", "live").lower()  # live | record | replay
+    LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", "recordings")
+    LLM_REPLAY_SPEEDUP = float(os.getenv("LLM_REPLAY_SPEEDUP", "1.0"))
+    SYSTEM_PROMPT = None  # None uses ClinicalAgent.SYSTEM_PROMPT
+    MEDICAL_KEYWORDS = None  # None uses FunctionValidator.MEDICAL_KEYWORDS
+    CONFIG_FILE = os.getenv("CONFIG_FILE")
+    CONFIG_RELOAD_INTERVAL_SECONDS = float(os.getenv("CONFIG_RELOAD_INTERVAL_SECONDS", "2"))
+    
+    # Settings CONFIG_FILE may override; they are re-read whenever the file changes
+    RELOADABLE = frozenset({
+        "DRY_RUN_MODE", "LOG_LEVEL", "MAX_FUNCTION_CALLS", "MAX_SLOT_PAGE_SIZE",
+        "REQUEST_DEADLINE_SECONDS", "MAX_DATE_RANGE_DAYS", "MAX_RESULT_ROWS",
+        "FUZZY_MATCH_MIN_SCORE", "LLM_QUEUE_TIMEOUT_SECONDS",
+        "SYSTEM_PROMPT", "MEDICAL_KEYWORDS"
+    })
     
     @classmethod
     def validate(cls):
-        if not cls.API_KEY:
+        if cls.LLM_MODE not in ("live", "record", "replay"):
+            raise ValueError(f"LLM_MODE must be live, record or replay (got '{cls.LLM_MODE}')")
+        if not cls.API_KEY and cls.LLM_MODE != "replay":
             raise ValueError("API_KEY not set in environment")
         return True
 
-config = Config()
\ No newline at end of file
+def _parse_setting(name: str, value: Any) -> Any:
+    """Validate one config-file value against the type of its environment default"""
+    if name == "SYSTEM_PROMPT":
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            raise ValueError("SYSTEM_PROMPT must be a string")
+        fields = {field for _, field, _, _ in string.Formatter().parse(value) if field is not None}
+        if "user_input" not in fields or not fields <= {"user_input", "session_context"}:
+            raise ValueError("SYSTEM_PROMPT may only use {user_input} (required) and {session_context}")
+        return value
+    
+    if name == "MEDICAL_KEYWORDS":
+        if value is None:
+            return None
+        if not isinstance(value, list) or not value or not all(isinstance(k, str) and k.strip() for k in value):
+            raise ValueError("MEDICAL_KEYWORDS must be a non-empty list of strings")
+        return tuple(k.strip().lower() for k in value)
+    
+    if name == "LOG_LEVEL":
+        if value not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+            raise ValueError("LOG_LEVEL must be DEBUG, INFO, WARNING, ERROR or CRITICAL")
+        return value
+    
+    default = getattr(Config, name)
+    if isinstance(default, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"{name} must be true or false")
+    elif isinstance(default, int):
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise ValueError(f"{name} must be a positive integer")
+    elif isinstance(default, float):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"{name} must be a non-negative number")
+        value = float(value)
+    return value
+
+
+class ConfigSnapshot:
+    """Immutable set of reloadable settings; requests keep the one they started with"""
+    
+    def __init__(self, values: Dict[str, Any], version: int, source: str):
+        self.values = dict(values)
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+
+_pinned_snapshot: ContextVar[Optional[ConfigSnapshot]] = ContextVar("pinned_config_snapshot", default=None)
+
+
+class ReloadableConfig:
+    """Config facade whose RELOADABLE settings can be swapped at runtime.
+    
+    Reads go to the snapshot pinned for the current request (see pinned())
+    or else the latest one; everything else falls through to Config. A
+    rejected reload leaves the previous snapshot in place.
+    """
+    
+    def __init__(self, defaults: type):
+        self._defaults = defaults
+        self._lock = threading.Lock()
+        self._file_mtime = None
+        self._watcher = None
+        self._current = ConfigSnapshot(
+            {name: getattr(defaults, name) for name in defaults.RELOADABLE}, version=1, source="environment"
+        )
+        audit_logger.set_level(defaults.LOG_LEVEL)
+    
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        values = self.snapshot().values
+        if name in values:
+            return values[name]
+        return getattr(self._defaults, name)
+    
+    def snapshot(self) -> ConfigSnapshot:
+        return _pinned_snapshot.get() or self._current
+    
+    @contextmanager
+    def pinned(self, snapshot: Optional[ConfigSnapshot] = None):
+        """Serve every config read in this context from one snapshot"""
+        snapshot = snapshot or self.snapshot()
+        token = _pinned_snapshot.set(snapshot)
+        try:
+            yield snapshot
+        finally:
+            _pinned_snapshot.reset(token)
+    
+    def reload(self) -> tuple[bool, str]:
+        """Re-read CONFIG_FILE; swap in a new snapshot only if every value is valid"""
+        path = self._defaults.CONFIG_FILE
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path) as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("config file must contain a JSON object")
+            
+            values = {name: getattr(self._defaults, name) for name in self._defaults.RELOADABLE}
+            for name, value in data.items():
+                if name not in self._defaults.RELOADABLE:
+                    raise ValueError(f"'{name}' cannot be set from the config file")
+                values[name] = _parse_setting(name, value)
+        except (OSError, ValueError) as e:
+            return False, f"{path}: {e}"
+        
+        with self._lock:
+            previous = self._current
+            self._current = ConfigSnapshot(values, previous.version + 1, path)
+            self._file_mtime = mtime
+        audit_logger.set_level(values["LOG_LEVEL"])
+        
+        changed = sorted(name for name in values if values[name] != previous.values[name])
+        return True, f"version {previous.version + 1}, changed: {', '.join(changed) or 'nothing'}"
+    
+    def start_watching(self, interval_seconds: Optional[float] = None):
+        """Poll CONFIG_FILE in a daemon thread and reload whenever it changes"""
+        if self._watcher is not None:
+            return
+        interval = interval_seconds or self._defaults.CONFIG_RELOAD_INTERVAL_SECONDS
+        
+        def _watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    mtime = os.stat(self._defaults.CONFIG_FILE).st_mtime_ns
+                except OSError:
+                    continue
+                if mtime == self._file_mtime:
+                    continue
+                ok, message = self.reload()
+                if ok:
+                    audit_logger.log_config_reload(message)
+                else:
+                    self._file_mtime = mtime
+                    audit_logger.log_error(f"Config reload rejected, keeping previous settings: {message}", "config")
+        
+        self._watcher = threading.Thread(target=_watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+
+config = ReloadableConfig(Config)
+
+if Config.CONFIG_FILE:
+    loaded, load_message = config.reload()
+    if not loaded:
+        raise ValueError(f"Invalid config file: {load_message}")
+    config.start_watching()
\ No newline at end of file
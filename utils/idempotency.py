@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from utils.config import config
+import hashlib
+import json
+import threading
+import time
+
+
+class IdempotencyKeyConflict(ValueError):
+    """An idempotency key was reused for a different request"""
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable digest of a request payload, stored alongside its idempotency key"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    def __init__(self, fingerprint: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.expires_at: Optional[float] = None
+
+
+class IdempotencyStore:
+    """Bounded TTL store of results keyed by idempotency key.
+
+    Concurrent calls with the same key are coalesced: the first caller runs
+    the work, later callers wait for it and get the same result. Finished
+    results are kept in completion order, which with a fixed TTL is also
+    expiry order, so expiry and overflow only ever pop from the front.
+    In-flight entries are held apart and never evicted.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._in_flight: Dict[str, _Entry] = {}
+        self._completed: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        key: str,
+        func: Callable[[], Any],
+        should_store: Callable[[Any], bool] = lambda result: True,
+        fingerprint: Optional[str] = None
+    ) -> tuple[Any, bool]:
+        """Return (result, replayed); func only runs if no live result exists for key.
+
+        Results rejected by should_store (e.g. transient errors) are handed
+        to callers already waiting but are not kept for later retries. A
+        fingerprint of the request payload is kept with the entry, and reusing
+        the key with a different fingerprint raises IdempotencyKeyConflict.
+        """
+        with self._lock:
+            self._evict_expired()
+            entry = self._completed.get(key) or self._in_flight.get(key)
+            owner = entry is None
+            if owner:
+                entry = _Entry(fingerprint)
+                self._in_flight[key] = entry
+
+        if not owner:
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyKeyConflict("Idempotency key was already used for a different request")
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.result, True
+
+        try:
+            entry.result = func()
+        except BaseException as e:
+            entry.error = e
+            raise
+        finally:
+            keep = False
+            try:
+                keep = entry.error is None and should_store(entry.result)
+            finally:
+                # Waiters are released even if should_store itself raises
+                with self._lock:
+                    del self._in_flight[key]
+                    if keep:
+                        entry.expires_at = time.monotonic() + self.ttl_seconds
+                        self._completed[key] = entry
+                        while len(self._completed) > self.max_entries:
+                            self._completed.popitem(last=False)
+                entry.done.set()
+
+        return entry.result, False
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        while self._completed:
+            oldest = next(iter(self._completed.values()))
+            if oldest.expires_at > now:
+                break
+            self._completed.popitem(last=False)
+
+    def __len__(self):
+        return len(self._in_flight) + len(self._completed)
+
+
+idempotency_store = IdempotencyStore(config.IDEMPOTENCY_MAX_ENTRIES, config.IDEMPOTENCY_TTL_SECONDS)